@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+        from .caching import require_shared_cache
+
+        # Role and active flag changes reach the other processes through the
+        # staleness markers in the cache
+        if 'app.authentication.ClaimsJWTAuthentication' in settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES']:
+            require_shared_cache('ClaimsJWTAuthentication')
+        # So do removed coordinators, through the evicted coordinated clubs
+        require_shared_cache('CanManageClub')
@@ -0,0 +1,118 @@
+import base64
+import binascii
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from .face_gallery import gallery_cache
+from .face_matching import decode_encoding
+from .models import StudentCourse, Attendance, AttendanceLog
+from .performance import schedule_rollup_refresh
+
+
+def mark_facial_attendance_batch(session, marks):
+    '''
+    Verifies and records a batch of kiosk facial attendance marks for one
+    session with set-based queries: one for enrolments, one for attendance
+    already marked today, then a single transaction bulk inserting every
+    Attendance and AttendanceLog row. Face probes of the whole batch are
+    scored against the session's roster gallery in one batched computation.
+    Students marked concurrently, whose insert the unique constraint drops,
+    are reported as 'already_marked'.
+
+    `marks` is a list of {'student': <user id>, 'face_encoding': <base64 of
+    little-endian float32 vector>}. Returns one result dict per mark, in order.
+    '''
+    results = [{'student': mark.get('student') if isinstance(mark, dict) else None} for mark in marks]
+    gallery = gallery_cache.get(session)
+
+    # Parse the payload, anything malformed is reported and skipped
+    pending = {}
+    for result, mark in zip(results, marks):
+        try:
+            student_id = int(mark['student'])
+            probe = decode_encoding(base64.b64decode(mark['face_encoding'], validate=True))
+        except (KeyError, TypeError, ValueError, binascii.Error):
+            result['status'] = 'invalid'
+            continue
+        result['student'] = student_id
+        if probe.shape != (gallery.dim,):
+            result['status'] = 'invalid'
+        elif student_id in pending:
+            result['status'] = 'duplicate'
+        else:
+            pending[student_id] = (result, probe)
+
+    today = timezone.localdate()
+    enrolled = set(StudentCourse.objects.filter(
+        course_id=session.course_id, status='active', student_id__in=list(pending)
+    ).values_list('student_id', flat=True))
+    already_marked = set(Attendance.objects.filter(
+        course_id=session.course_id, date=today, student_id__in=list(pending)
+    ).values_list('student_id', flat=True))
+
+    to_match = []
+    for student_id, (result, probe) in pending.items():
+        if student_id not in enrolled:
+            result['status'] = 'not_enrolled'
+        elif student_id in already_marked:
+            result['status'] = 'already_marked'
+        elif student_id not in gallery:
+            result['status'] = 'face_not_enrolled'
+        else:
+            to_match.append((student_id, result, probe))
+
+    # Tags this batch's rows, to tell them from concurrent marks after the insert
+    batch = uuid.uuid4().hex
+    attendances = []
+    logs = []
+    if to_match:
+        matches = gallery.match_many([probe for _, _, probe in to_match])
+        for (student_id, result, _), (matched_user_id, distance) in zip(to_match, matches):
+            result['distance'] = distance
+            if matched_user_id == student_id:
+                attendances.append((result, Attendance(
+                    student_id=student_id,
+                    course_id=session.course_id,
+                    date=today,
+                    status='present',
+                    verification_method='facial_recognition',
+                    verification_data={'matched': True, 'distance': distance, 'batch': batch}
+                )))
+            else:
+                result['status'] = 'no_match'
+                logs.append(AttendanceLog(
+                    student_id=student_id,
+                    course_id=session.course_id,
+                    session=session,
+                    status='absent',
+                    method='facial_recognition',
+                    notes=f'Face verification failed (distance {distance:.3f})'
+                ))
+
+    with transaction.atomic():
+        # A single mark may have landed since the check above, the unique
+        # (student, course, date) constraint keeps the first one
+        Attendance.objects.bulk_create([attendance for _, attendance in attendances], ignore_conflicts=True)
+        inserted = set(Attendance.objects.filter(
+            course_id=session.course_id, date=today, verification_data__batch=batch,
+            student_id__in=[attendance.student_id for _, attendance in attendances],
+        ).values_list('student_id', flat=True))
+        for result, attendance in attendances:
+            if attendance.student_id in inserted:
+                result['status'] = 'present'
+                logs.append(AttendanceLog(
+                    student_id=attendance.student_id,
+                    course_id=session.course_id,
+                    session=session,
+                    status='present',
+                    method='facial_recognition'
+                ))
+            else:
+                result['status'] = 'already_marked'
+        AttendanceLog.objects.bulk_create(logs)
+        # bulk_create skips post_save, so refresh the rollups explicitly
+        schedule_rollup_refresh(inserted)
+
+    return results
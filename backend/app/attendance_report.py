@@ -0,0 +1,77 @@
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils.dateparse import parse_date
+
+from .models import Attendance
+
+
+ATTENDANCE_STATUSES = [status for status, _ in Attendance.STATUS_CHOICES]
+
+
+class AttendanceReportError(ValueError):
+    pass
+
+
+def parse_report_params(query_params):
+    '''
+    (start, end, below) from the `from` / `to` dates (inclusive) and the
+    `below` percentage of a report request, each None when omitted
+    '''
+    bounds = []
+    for name in ('from', 'to'):
+        value = query_params.get(name)
+        try:
+            day = parse_date(value) if value else None
+        except ValueError:
+            day = None
+        if value and day is None:
+            raise AttendanceReportError(f'Invalid {name!r}, use YYYY-MM-DD')
+        bounds.append(day)
+
+    below = query_params.get('below')
+    if below:
+        try:
+            below = float(below)
+        except ValueError:
+            raise AttendanceReportError("'below' must be a percentage")
+    return bounds[0], bounds[1], below or None
+
+
+def course_attendance_report(course_id, start=None, end=None, below=None):
+    '''
+    Per student attendance of a course in one GROUP BY query: a count per
+    status (conditional aggregation), the total and the percentage of
+    'present' marks, computed like the performance rollups. The date range
+    (inclusive) becomes the WHERE clause and `below` a HAVING
+    percentage < below, so only the rows of the report leave the database.
+    Ordered by roll number.
+    '''
+    records = Attendance.objects.filter(course_id=course_id)
+    if start:
+        records = records.filter(date__gte=start)
+    if end:
+        records = records.filter(date__lte=end)
+
+    counts = {status: Count('id', filter=Q(status=status)) for status in ATTENDANCE_STATUSES}
+    rows = (
+        records
+        .values('student_id', 'student__roll_no', 'student__first_name', 'student__last_name')
+        .annotate(total=Count('id'), **counts)
+        .annotate(percentage=Cast('present', FloatField()) * 100 / F('total'))
+        .order_by('student__roll_no', 'student_id')
+    )
+    if below is not None:
+        rows = rows.filter(percentage__lt=below)
+
+    return [
+        {
+            'student_id': row['student_id'],
+            'roll_no': row['student__roll_no'],
+            'first_name': row['student__first_name'],
+            'last_name': row['student__last_name'],
+            **{status: row[status] for status in ATTENDANCE_STATUSES},
+            'total': row['total'],
+            'percentage': round(row['percentage'], 2),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+from .token_blacklist import blacklist_filter
+
+
+# Claims copied into every token, enough for the role checks of most views
+USER_CLAIMS = ('role', 'email', 'is_active')
+
+
+class ClaimsRefreshToken(RefreshToken):
+    '''
+    Refresh token carrying USER_CLAIMS, access tokens derived from it inherit
+    them. Blacklist checks go through the in memory `blacklist_filter`.
+    '''
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_filter:
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
+
+
+##############################################################################################################################
+# Full user objects
+class UserCache:
+    '''
+    Process local LRU of User rows by id, for the views that need more than
+    the token claims. Entries are evicted from app/signals.py when a user is
+    saved or deleted.
+    '''
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is not None:
+                self._users.move_to_end(user_id)
+                return user
+
+        user = User.objects.get(pk=user_id)
+        with self._lock:
+            self._users[user_id] = user
+            while len(self._users) > settings.AUTH_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+def _stale_key(user_id):
+    return f'auth:claims-stale:{user_id}'
+
+
+def mark_claims_stale(user_id):
+    '''
+    Tokens of `user_id` issued before now no longer reflect the user's role,
+    email or active flag, they are verified against the database until they
+    expire
+    '''
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    cache.set(_stale_key(user_id), time.time(), timeout=lifetime.total_seconds())
+
+
+def claims_are_fresh(user_id, issued_at):
+    stale_since = cache.get(_stale_key(user_id))
+    return stale_since is None or issued_at > stale_since
+
+
+class ClaimsUser(TokenUser):
+    '''
+    Lightweight user built from token claims. Attributes that are not claims
+    (names, roll number, ...) come from the full User, loaded through
+    `user_cache` on first use. Use `.id` rather than the object itself for
+    foreign keys.
+    '''
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @cached_property
+    def email(self):
+        return self.token['email']
+
+    @cached_property
+    def is_active(self):
+        return self.token['is_active']
+
+    @cached_property
+    def user(self):
+        return user_cache.get(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    '''
+    JWTAuthentication without the User query: the user is built from the
+    token's claims. Tokens issued before USER_CLAIMS were added, or before the
+    user's claims last changed, fall back to loading the User row.
+    '''
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            return super().get_user(validated_token)
+
+        has_claims = all(claim in validated_token for claim in USER_CLAIMS)
+        if (not has_claims or not validated_token['is_active']
+                or not claims_are_fresh(user_id, validated_token.get('iat', 0))):
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
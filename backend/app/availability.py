@@ -0,0 +1,114 @@
+import math
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .bookings import BLOCKING_STATUSES
+from .models import ResourceBooking
+
+
+class AvailabilityError(ValueError):
+    pass
+
+
+def parse_availability_params(query_params):
+    '''
+    Reads `date` or `start_date`/`end_date` (YYYY-MM-DD) and `slot_minutes`
+    from the query string, returns (start_date, end_date, slot_minutes)
+    '''
+    date_str = query_params.get('date')
+    start_str = query_params.get('start_date', date_str)
+    end_str = query_params.get('end_date', start_str)
+    if not start_str:
+        raise AvailabilityError('Date parameter is required')
+    try:
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
+    except ValueError:
+        raise AvailabilityError('Invalid date format. Use YYYY-MM-DD')
+    if end_date < start_date:
+        raise AvailabilityError('end_date must not be before start_date')
+    if (end_date - start_date).days >= settings.RESOURCE_AVAILABILITY_MAX_DAYS:
+        raise AvailabilityError(
+            f'At most {settings.RESOURCE_AVAILABILITY_MAX_DAYS} days can be requested at once')
+
+    open_hour, close_hour = settings.RESOURCE_AVAILABILITY_HOURS
+    window = (close_hour - open_hour) * 60
+    try:
+        slot_minutes = int(query_params.get('slot_minutes', 60))
+    except ValueError:
+        raise AvailabilityError('slot_minutes must be a number')
+    if slot_minutes < 5 or window % slot_minutes:
+        raise AvailabilityError(
+            f'slot_minutes must be at least 5 and divide the {window} minute booking window')
+    return start_date, end_date, slot_minutes
+
+
+def _day_opening(day):
+    open_hour, _ = settings.RESOURCE_AVAILABILITY_HOURS
+    return timezone.make_aware(datetime.combine(day, time(open_hour)))
+
+
+def compute_availability(resources, start_date, end_date, slot_minutes):
+    '''
+    Slot availability of every resource for each day between `start_date` and
+    `end_date` (inclusive). The bookings of all resources that hold their slot
+    (BLOCKING_STATUSES) are fetched in one query and swept once: each booking
+    marks the run of slots it overlaps in a per resource bitmap with a single
+    slice assignment, so the work grows with the number of bookings rather
+    than slots x bookings.
+
+    Returns {resource id: [{'date', 'time_slots': [...]}, ...]}
+    '''
+    open_hour, close_hour = settings.RESOURCE_AVAILABILITY_HOURS
+    slots_per_day = (close_hour - open_hour) * 60 // slot_minutes
+    num_days = (end_date - start_date).days + 1
+    slot_length = timedelta(minutes=slot_minutes)
+
+    busy = {resource.id: bytearray(num_days * slots_per_day) for resource in resources}
+    bookings = ResourceBooking.objects.filter(
+        resource_id__in=list(busy),
+        status__in=BLOCKING_STATUSES,
+        start_time__lt=_day_opening(end_date) + timedelta(hours=close_hour - open_hour),
+        end_time__gt=_day_opening(start_date),
+    ).values_list('resource_id', 'start_time', 'end_time')
+
+    for resource_id, booking_start, booking_end in bookings:
+        bitmap = busy[resource_id]
+        first_day = max((timezone.localdate(booking_start) - start_date).days, 0)
+        last_day = min((timezone.localdate(booking_end) - start_date).days, num_days - 1)
+        for day in range(first_day, last_day + 1):
+            opening = _day_opening(start_date + timedelta(days=day))
+            first = math.floor((booking_start - opening) / slot_length)
+            last = math.ceil((booking_end - opening) / slot_length)
+            first, last = max(first, 0), min(last, slots_per_day)
+            if first < last:
+                offset = day * slots_per_day
+                bitmap[offset + first:offset + last] = b'\x01' * (last - first)
+
+    labels = []
+    for i in range(slots_per_day):
+        slot_start = datetime.combine(start_date, time(open_hour)) + i * slot_length
+        labels.append((slot_start.strftime('%H:%M'), (slot_start + slot_length).strftime('%H:%M')))
+
+    availability = {}
+    for resource in resources:
+        bitmap = busy[resource.id]
+        bookable = resource.status == 'available'
+        days = []
+        for day in range(num_days):
+            offset = day * slots_per_day
+            days.append({
+                'date': (start_date + timedelta(days=day)).isoformat(),
+                'time_slots': [
+                    {
+                        'start_time': slot_start,
+                        'end_time': slot_end,
+                        'is_available': bookable and not bitmap[offset + i]
+                    }
+                    for i, (slot_start, slot_end) in enumerate(labels)
+                ]
+            })
+        availability[resource.id] = days
+    return availability
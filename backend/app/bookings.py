@@ -0,0 +1,55 @@
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Resource, ResourceBooking
+
+
+# Bookings in these states hold their time slot
+BLOCKING_STATUSES = ['pending', 'approved']
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def lock_resource(resource_id):
+    '''
+    Serializes booking attempts for one resource until the surrounding
+    transaction ends. Backends with row locks take SELECT ... FOR UPDATE on
+    the resource row. SQLite has no row locks, there a no-op UPDATE of the row
+    acquires the database write lock up front, so two transactions can't both
+    pass the conflict check before either inserts.
+
+    Raises Resource.DoesNotExist.
+    '''
+    if connection.features.has_select_for_update:
+        return Resource.objects.select_for_update().get(pk=resource_id)
+    if not Resource.objects.filter(pk=resource_id).update(status=F('status')):
+        raise Resource.DoesNotExist
+    return Resource.objects.get(pk=resource_id)
+
+
+def create_booking(resource_id, user_id, start_time, end_time, **fields):
+    '''
+    Atomically checks for overlapping pending/approved bookings and creates a
+    pending one. Raises BookingConflict when the slot is taken.
+    '''
+    with transaction.atomic():
+        resource = lock_resource(resource_id)
+        conflicting_bookings = ResourceBooking.objects.filter(
+            resource=resource,
+            status__in=BLOCKING_STATUSES,
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+        if conflicting_bookings.exists():
+            raise BookingConflict('Resource is already booked for this time period')
+
+        return ResourceBooking.objects.create(
+            resource=resource,
+            user_id=user_id,
+            start_time=start_time,
+            end_time=end_time,
+            status='pending',
+            **fields
+        )
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+
+def is_process_local(alias='default'):
+    '''
+    Whether entries of cache `alias` are only seen by the process writing them
+    '''
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def require_shared_cache(feature, alias='default'):
+    '''
+    Raises ImproperlyConfigured when `feature` relies on every server process
+    seeing the invalidations written to cache `alias`, but that cache is
+    process local and the app is not declared SINGLE_PROCESS
+    '''
+    if is_process_local(alias) and not settings.SINGLE_PROCESS:
+        raise ImproperlyConfigured(
+            f'{feature} needs CACHES[{alias!r}] shared by every server process '
+            f'(Redis, Memcached, database or file based), or SINGLE_PROCESS = True')
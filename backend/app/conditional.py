@@ -0,0 +1,47 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class Validators:
+    '''
+    ETag and Last-Modified of a representation. The ETag covers the query
+    string too since sparse fieldsets and pages change the body.
+    '''
+    def __init__(self, request, *parts, last_modified=None):
+        raw = '|'.join(str(part) for part in (request.get_full_path(), *parts))
+        self.etag = quote_etag(hashlib.blake2b(raw.encode(), digest_size=12).hexdigest())
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    def not_modified(self, request):
+        '''
+        304 response when the client's If-None-Match / If-Modified-Since
+        still match, otherwise None
+        '''
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def apply(self, response):
+        if response.status_code != 200:
+            return response
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        return response
+
+
+def list_validators(request, queryset, related=()):
+    '''
+    ETag of a list from one aggregate query: the newest updated_at catches
+    edits and inserts, the row count catches deletes. No Last-Modified, a
+    delete leaves MAX(updated_at) unchanged. `related` names the embedded
+    (expanded) relations whose edits change the body as well.
+    '''
+    aggregates = {f'{name}_modified': Max(f'{name}__updated_at') for name in related}
+    stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'), **aggregates)
+    return Validators(request, stats['count'], stats['last_modified'], *(stats[key] for key in aggregates))
+
+
+def object_validators(request, obj):
+    return Validators(request, obj.pk, obj.updated_at, last_modified=obj.updated_at)
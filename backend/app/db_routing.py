@@ -0,0 +1,124 @@
+import contextvars
+import functools
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Routing state of the current request (or management command / task)
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+STICKY_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        # Reads stay on the primary, e.g. after a write in this request
+        self.pinned = pinned
+        # Opted into replica reads with `replica_reads`
+        self.replica_ok = False
+        self.wrote = False
+
+
+def _current_state():
+    state = _state.get()
+    if state is None:
+        state = RoutingState()
+        _state.set(state)
+    return state
+
+
+@contextmanager
+def routing_state(pinned=False):
+    token = _state.set(RoutingState(pinned))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def _replica_ok(value):
+    state = _current_state()
+    previous, state.replica_ok = state.replica_ok, value
+    try:
+        yield
+    finally:
+        state.replica_ok = previous
+
+
+def replica_reads(view_method):
+    '''
+    Lets the reads of a view method go to a replica (until it writes). Only
+    for endpoints that tolerate replication lag.
+    '''
+    @functools.wraps(view_method)
+    def wrapper(*args, **kwargs):
+        with _replica_ok(True):
+            return view_method(*args, **kwargs)
+    return wrapper
+
+
+def primary_reads():
+    '''
+    Context manager sending reads to the primary, for code that computes
+    something it is about to write
+    '''
+    return _replica_ok(False)
+
+
+class PrimaryReplicaRouter:
+    '''
+    Writes go to the primary ('default'). Reads go to a random alias of
+    DATABASE_REPLICAS only inside `replica_reads` views, outside a
+    transaction, and as long as the request has not written anything nor
+    been pinned to the primary by ReplicaStickinessMiddleware.
+    '''
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        state = _state.get()
+        if (not replicas or state is None or not state.replica_ok or state.pinned
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _current_state()
+        state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+class ReplicaStickinessMiddleware:
+    '''
+    Gives every request its own routing state. Unsafe methods read from the
+    primary throughout, and a client that wrote keeps reading from the
+    primary for DATABASE_REPLICA_STICKY_SECONDS (via a cookie) so it sees its
+    own writes despite replication lag.
+    '''
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        pinned = request.method not in SAFE_METHODS or pinned_until > time.time()
+
+        with routing_state(pinned) as state:
+            response = self.get_response(request)
+            if state.wrote and settings.DATABASE_REPLICAS:
+                sticky = settings.DATABASE_REPLICA_STICKY_SECONDS
+                response.set_cookie(STICKY_COOKIE, str(time.time() + sticky), max_age=sticky, httponly=True)
+        return response
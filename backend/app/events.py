@@ -0,0 +1,79 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Event
+from .response_cache import bump_versions
+
+
+class EventWindowError(ValueError):
+    pass
+
+
+def _parse_bound(name, value, end_of_day):
+    try:
+        day = parse_date(value)
+        if day is not None:
+            # A bare date covers that whole day
+            parsed = datetime.combine(day + timedelta(days=1) if end_of_day else day, time())
+        else:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValueError
+    except ValueError:
+        raise EventWindowError(f'Invalid {name!r}, use YYYY-MM-DD or an ISO 8601 datetime')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_event_window(queryset, query_params):
+    '''
+    Narrows events to those starting in [`from`, `to`), a range scan on the
+    start_time index. Either bound may be omitted.
+    '''
+    start = query_params.get('from')
+    end = query_params.get('to')
+    if start:
+        queryset = queryset.filter(start_time__gte=_parse_bound('from', start, end_of_day=False))
+    if end:
+        queryset = queryset.filter(start_time__lt=_parse_bound('to', end, end_of_day=True))
+    return queryset
+
+
+def reserve_event_seat(event_id):
+    '''
+    Takes one seat of an event if it has capacity left, in one UPDATE so
+    concurrent registrations can't overshoot max_participants. Events without
+    a limit (max_participants empty or 0) always have room.
+    Returns whether a seat was taken.
+    '''
+    has_room = (
+        Q(max_participants__isnull=True)
+        | Q(max_participants=0)
+        | Q(registered_count__lt=F('max_participants'))
+    )
+    reserved = bool(Event.objects.filter(has_room, pk=event_id).update(
+        registered_count=F('registered_count') + 1,
+        updated_at=timezone.now()
+    ))
+    if reserved:
+        # registered_count is part of the cached event listings
+        bump_versions(Event)
+        transaction.on_commit(lambda: bump_versions(Event))
+    return reserved
+
+
+def release_event_seat(event_id):
+    '''
+    Gives back a seat when a registration is removed
+    '''
+    if Event.objects.filter(pk=event_id, registered_count__gt=0).update(
+        registered_count=F('registered_count') - 1,
+        updated_at=timezone.now()
+    ):
+        bump_versions(Event)
+        transaction.on_commit(lambda: bump_versions(Event))
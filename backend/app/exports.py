@@ -0,0 +1,134 @@
+import csv
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, GradeReport, EventRegistration
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _integer(value):
+    return int(value)
+
+
+def _date(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError
+    return day
+
+
+class Export:
+    '''
+    A dump of one model: `columns` are (header, values_list lookup) pairs,
+    `filters` map query parameters to (lookup, parser)
+    '''
+    def __init__(self, model, columns, filters):
+        self.model = model
+        self.headers = [header for header, _ in columns]
+        self.lookups = [lookup for _, lookup in columns]
+        self.filters = filters
+
+    def queryset(self, query_params):
+        '''
+        Tuples of the export's columns, filtered by the query parameters, in
+        primary key order
+        '''
+        conditions = {}
+        for name, (lookup, parse) in self.filters.items():
+            value = query_params.get(name)
+            if not value:
+                continue
+            try:
+                conditions[lookup] = parse(value)
+            except ValueError:
+                raise ExportError(f'Invalid {name!r}')
+        return self.model.objects.filter(**conditions).order_by('pk').values_list(*self.lookups)
+
+
+EXPORTS = {
+    'attendance': Export(
+        Attendance,
+        [('id', 'id'), ('student_id', 'student_id'), ('roll_no', 'student__roll_no'),
+         ('course_code', 'course__code'), ('date', 'date'), ('status', 'status'),
+         ('verification_method', 'verification_method')],
+        {'course': ('course_id', _integer), 'year': ('date__year', _integer),
+         'from': ('date__gte', _date), 'to': ('date__lte', _date)},
+    ),
+    'grades': Export(
+        GradeReport,
+        [('id', 'id'), ('student_id', 'student_id'), ('roll_no', 'student__roll_no'),
+         ('course_code', 'course__code'), ('semester', 'semester'), ('year', 'year'),
+         ('grade', 'grade'), ('gpa', 'gpa')],
+        {'course': ('course_id', _integer), 'semester': ('semester', str), 'year': ('year', _integer)},
+    ),
+    'registrations': Export(
+        EventRegistration,
+        [('id', 'id'), ('event_id', 'event_id'), ('event_title', 'event__title'),
+         ('user_id', 'user_id'), ('roll_no', 'user__roll_no'),
+         ('registration_time', 'registration_time'), ('attendance_status', 'attendance_status')],
+        {'event': ('event_id', _integer), 'club': ('event__club_id', _integer)},
+    ),
+}
+
+
+class _Echo:
+    '''
+    File-like object handing back what csv.writer writes
+    '''
+    def write(self, value):
+        return value
+
+
+def _batches(rows, size):
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv_chunks(headers, rows, size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for batch in _batches(rows, size):
+        yield ''.join(writer.writerow(row) for row in batch)
+
+
+def _ndjson_chunks(headers, rows, size):
+    encoder = DjangoJSONEncoder()
+    for batch in _batches(rows, size):
+        yield ''.join(encoder.encode(dict(zip(headers, row))) + '\n' for row in batch)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(export, queryset, format, compress=False):
+    '''
+    Encoded chunks of the export, EXPORT_CHUNK_SIZE rows at a time. Rows are
+    read with a chunked iterator, so memory stays flat whatever the row count.
+    '''
+    size = settings.EXPORT_CHUNK_SIZE
+    rows = queryset.iterator(chunk_size=size)
+    chunks = (_csv_chunks if format == 'csv' else _ndjson_chunks)(export.headers, rows, size)
+    chunks = (chunk.encode() for chunk in chunks)
+    return _gzipped(chunks) if compress else chunks
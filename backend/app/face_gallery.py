@@ -0,0 +1,175 @@
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+
+from .face_matching import RosterGallery, load_course_gallery
+
+
+##############################################################################################################################
+# Shard format
+#
+# Little-endian, fixed width, one file per course roster:
+#
+#   header   32 bytes  magic b'FGAL', format version (u16), vector dtype (u8),
+#                      padding, count (u32), dim (u32), built at (u64, unix
+#                      nanoseconds), padding
+#   ids      count x int64, sorted user ids
+#   vectors  count x dim x float32|float16, row i belongs to ids[i]
+#
+# Both arrays start on 8 byte boundaries so they can be viewed straight out of
+# the mapping without copying.
+
+MAGIC = b'FGAL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHBxIIQ8x')
+
+DTYPES = {
+    1: np.dtype('<f4'),
+    2: np.dtype('<f2'),
+}
+DTYPE_CODES = {'float32': 1, 'float16': 2}
+
+
+class GalleryFormatError(Exception):
+    pass
+
+
+def shard_path(course_id):
+    return Path(settings.FACE_GALLERY_DIR) / f'course_{course_id}.fgal'
+
+
+def write_shard(path, user_ids, matrix, dtype='float32'):
+    '''
+    Writes a shard atomically: the file is built next to its destination and
+    renamed over it, so readers either map the old or the new file, and
+    processes still mapping the old one keep valid pages
+    '''
+    code = DTYPE_CODES[dtype]
+    user_ids = np.ascontiguousarray(user_ids, dtype='<i8')
+    matrix = np.ascontiguousarray(matrix, dtype=DTYPES[code])
+    count, dim = matrix.shape
+    if len(user_ids) != count:
+        raise GalleryFormatError('ids and vectors differ in length')
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, code, count, dim, time.time_ns()))
+            f.write(user_ids.tobytes())
+            f.write(matrix.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def open_shard(path):
+    '''
+    Maps a shard read-only and returns a RosterGallery whose ids and float32
+    matrix are views on the shared page cache. float16 shards are widened to
+    float32 on open, trading the zero-copy property for half the disk size.
+    '''
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise GalleryFormatError(f'{path} is truncated')
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, code, count, dim, _ = HEADER.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise GalleryFormatError(f'{path} is not a face gallery')
+    if version != FORMAT_VERSION:
+        raise GalleryFormatError(f'{path} has unsupported version {version}')
+    if code not in DTYPES:
+        raise GalleryFormatError(f'{path} has unknown vector dtype {code}')
+    dtype = DTYPES[code]
+    vectors_offset = HEADER.size + count * 8
+    if size != vectors_offset + count * dim * dtype.itemsize:
+        raise GalleryFormatError(f'{path} does not match its header')
+
+    user_ids = np.frombuffer(mapping, dtype='<i8', count=count, offset=HEADER.size)
+    matrix = np.frombuffer(
+        mapping, dtype=dtype, count=count * dim, offset=vectors_offset).reshape(count, dim)
+    return RosterGallery(user_ids, matrix)
+
+
+def export_course_gallery(course_id):
+    '''
+    (Re)builds the shard of one course roster from the database
+    '''
+    gallery = load_course_gallery(course_id)
+    return write_shard(
+        shard_path(course_id), gallery.user_ids, gallery.matrix, settings.FACE_GALLERY_DTYPE)
+
+
+def schedule_gallery_export(course_ids):
+    '''
+    Rebuilds the shards of `course_ids` once the current transaction commits
+    '''
+    course_ids = set(course_ids)
+    if course_ids:
+        transaction.on_commit(lambda: [export_course_gallery(course_id) for course_id in course_ids])
+
+
+##############################################################################################################################
+# Per process cache
+class GalleryCache:
+    '''
+    Process-local LRU of mapped roster galleries keyed by attendance session.
+    A cached gallery is reused as long as its shard file has not been
+    replaced; every worker maps the same file, so a rebuild in one process is
+    picked up by all of them on their next probe.
+    '''
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session):
+        path = shard_path(session.course_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            export_course_gallery(session.course_id)
+            stat = path.stat()
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(session.id)
+            if entry and entry[1] == signature:
+                self._entries.move_to_end(session.id)
+                return entry[2]
+
+        gallery = open_shard(path)
+        with self._lock:
+            self._entries[session.id] = (session.course_id, signature, gallery)
+            self._entries.move_to_end(session.id)
+            while len(self._entries) > settings.FACE_GALLERY_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return gallery
+
+    def invalidate_course(self, course_id):
+        with self._lock:
+            for session_id in [k for k, v in self._entries.items() if v[0] == course_id]:
+                del self._entries[session_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+gallery_cache = GalleryCache()
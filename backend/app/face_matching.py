@@ -0,0 +1,140 @@
+import numpy as np
+from PIL import ImageOps
+
+from django.conf import settings
+
+from .face_pipeline import normalize_face
+from .models import FacialRecognitionData
+
+
+# Encodings are stored in FacialRecognitionData.face_encoding as raw
+# little-endian float32 bytes
+ENCODING_DTYPE = np.dtype('<f4')
+
+
+def decode_encoding(blob):
+    '''
+    Turns a stored face_encoding blob into a float32 vector (no copy)
+    '''
+    return np.frombuffer(blob, dtype=ENCODING_DTYPE)
+
+
+def encode_encoding(vector):
+    '''
+    Serializes a vector to the face_encoding storage format
+    '''
+    return np.asarray(vector, dtype=ENCODING_DTYPE).tobytes()
+
+
+def encoding_dim():
+    width, height = settings.FACE_ENCODING_SIZE
+    return width * height
+
+
+def image_to_encoding(image):
+    '''
+    Encodes an already decoded PIL image the same way the upload pipeline in
+    app/face_pipeline.py does (EXIF orientation, grayscale, square crop,
+    FACE_ENCODING_SIZE thumbnail). Any embedding model can replace this as
+    long as enrolment and probes use the same one.
+    '''
+    return normalize_face(ImageOps.exif_transpose(image), settings.FACE_ENCODING_SIZE)
+
+
+class RosterGallery:
+    '''
+    Face encodings of a course roster held as one contiguous (n, d) float32
+    matrix so a probe is scored against everyone with a single matrix-vector
+    product: |g - p|^2 = |g|^2 - 2 g.p + |p|^2
+    '''
+    def __init__(self, user_ids, matrix):
+        self.user_ids = np.ascontiguousarray(user_ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self._index = {user_id: i for i, user_id in enumerate(self.user_ids.tolist())}
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id):
+        return user_id in self._index
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def distances(self, probe):
+        '''
+        Euclidean distance from `probe` to every encoding in the roster
+        '''
+        probe = np.asarray(probe, dtype=np.float32)
+        sq = self.sq_norms - 2.0 * (self.matrix @ probe) + probe @ probe
+        np.maximum(sq, 0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def match(self, probe, threshold=None):
+        '''
+        Returns (user_id, distance) of the closest roster encoding, user_id is
+        None when nobody is within `threshold`
+        '''
+        if threshold is None:
+            threshold = settings.FACE_MATCH_THRESHOLD
+        if not len(self) or np.shape(probe) != (self.dim,):
+            return None, float('inf')
+        distances = self.distances(probe)
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance > threshold:
+            return None, distance
+        return int(self.user_ids[best]), distance
+
+    def match_many(self, probes, threshold=None):
+        '''
+        Batched `match` for an (m, d) array of probes
+        '''
+        if threshold is None:
+            threshold = settings.FACE_MATCH_THRESHOLD
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dim)
+        if not len(self):
+            return [(None, float('inf'))] * len(probes)
+        sq = (
+            self.sq_norms[None, :]
+            - 2.0 * (probes @ self.matrix.T)
+            + np.einsum('ij,ij->i', probes, probes)[:, None]
+        )
+        np.maximum(sq, 0, out=sq)
+        best = np.argmin(sq, axis=1)
+        distances = np.sqrt(sq[np.arange(len(probes)), best])
+        return [
+            (int(self.user_ids[i]) if d <= threshold else None, float(d))
+            for i, d in zip(best, distances)
+        ]
+
+
+def load_course_gallery(course_id):
+    '''
+    Builds the gallery of every actively enrolled student of a course that has
+    active face data, in one query
+    '''
+    rows = (
+        FacialRecognitionData.objects.filter(
+            status='active',
+            user__studentcourse__course_id=course_id,
+            user__studentcourse__status='active',
+        )
+        .distinct()
+        .order_by('user_id')
+        .values_list('user_id', 'face_encoding')
+    )
+    dim = encoding_dim()
+    user_ids = []
+    vectors = []
+    for user_id, blob in rows:
+        vector = decode_encoding(blob)
+        # Encodings from a different pipeline/size can't be compared
+        if vector.shape == (dim,):
+            user_ids.append(user_id)
+            vectors.append(vector)
+    matrix = np.vstack(vectors) if vectors else np.empty((0, dim), dtype=np.float32)
+    return RosterGallery(user_ids, matrix)
+
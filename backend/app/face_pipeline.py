@@ -0,0 +1,182 @@
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from django.conf import settings
+
+
+# This module is imported by the pool workers, keep it free of model imports
+# so it also works with the spawn/forkserver start methods
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('queue', 'decode', 'orient', 'normalize')
+
+
+class InvalidImage(Exception):
+    pass
+
+
+class PipelineBusy(Exception):
+    pass
+
+
+def normalize_face(image, encoding_size):
+    '''
+    Grayscale, centre square crop and resize to `encoding_size`, returned as
+    a mean centred, L2 normalized float32 vector
+    '''
+    image = ImageOps.fit(image.convert('L'), encoding_size, Image.BILINEAR)
+    vector = np.asarray(image, dtype=np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def preprocess_face_image(data, encoding_size, decode_size, max_pixels):
+    '''
+    Image bytes -> face encoding, with per stage timings in ms. JPEGs are
+    decoded in draft mode, letting libjpeg downscale by up to 8x while
+    decoding instead of materialising the full resolution photo.
+    '''
+    timings = {}
+    started = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        if width * height > max_pixels:
+            raise InvalidImage(f'Image is too large ({width}x{height})')
+        image.draft('L', (decode_size, decode_size))
+        image.load()
+        timings['decode'] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        image = ImageOps.exif_transpose(image)
+        timings['orient'] = (time.perf_counter() - started) * 1000
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImage(f'Invalid face image: {e}')
+
+    started = time.perf_counter()
+    vector = normalize_face(image, encoding_size)
+    timings['normalize'] = (time.perf_counter() - started) * 1000
+    return vector, timings
+
+
+class FacePipeline:
+    '''
+    Runs face image preprocessing in a process pool so request threads only
+    wait on it. At most FACE_PIPELINE_QUEUE_SIZE images are submitted at a
+    time, further requests wait up to FACE_PIPELINE_QUEUE_TIMEOUT seconds for
+    a slot and are then rejected with PipelineBusy. Queue depth counts both. With
+    FACE_PIPELINE_WORKERS = 0 images are processed inline. A pool broken by a
+    crashed worker fails the image it was processing with PipelineBusy and is
+    replaced by a fresh one for the next request.
+    '''
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._stats = {stage: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0} for stage in STAGES}
+        self._rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(settings.FACE_PIPELINE_QUEUE_SIZE)
+            if self._executor is None and settings.FACE_PIPELINE_WORKERS:
+                self._executor = ProcessPoolExecutor(max_workers=settings.FACE_PIPELINE_WORKERS)
+            return self._executor
+
+    def process(self, data):
+        '''
+        Returns (encoding, timings) for the image bytes in `data`
+        '''
+        if len(data) > settings.FACE_UPLOAD_MAX_BYTES:
+            raise InvalidImage('Face image is too large')
+
+        executor = self._get_executor()
+        queued = time.perf_counter()
+        with self._lock:
+            self._depth += 1
+        if not self._slots.acquire(timeout=settings.FACE_PIPELINE_QUEUE_TIMEOUT):
+            with self._lock:
+                self._depth -= 1
+                self._rejected += 1
+            raise PipelineBusy('Face processing queue is full')
+
+        try:
+            args = (
+                data, settings.FACE_ENCODING_SIZE, settings.FACE_PIPELINE_DECODE_SIZE,
+                settings.FACE_IMAGE_MAX_PIXELS,
+            )
+            if executor is None:
+                vector, timings = preprocess_face_image(*args)
+            else:
+                try:
+                    vector, timings = executor.submit(preprocess_face_image, *args).result()
+                except BrokenProcessPool:
+                    logger.exception('Face pipeline worker died, restarting the pool')
+                    self._discard_executor(executor)
+                    raise PipelineBusy('Face processing was interrupted')
+        finally:
+            with self._lock:
+                self._depth -= 1
+            self._slots.release()
+
+        total = (time.perf_counter() - queued) * 1000
+        timings['queue'] = max(total - sum(timings.values()), 0.0)
+        self._record(timings)
+        logger.debug('Face image processed in %.1f ms %s', total, timings)
+        return vector, timings
+
+    def _record(self, timings):
+        with self._lock:
+            for stage, ms in timings.items():
+                stats = self._stats[stage]
+                stats['count'] += 1
+                stats['total_ms'] += ms
+                stats['max_ms'] = max(stats['max_ms'], ms)
+
+    def stats(self):
+        '''
+        Current queue depth plus count, mean and max duration of every stage
+        '''
+        with self._lock:
+            return {
+                'queue_depth': self._depth,
+                'queue_capacity': settings.FACE_PIPELINE_QUEUE_SIZE,
+                'rejected': self._rejected,
+                'stages': {
+                    stage: {
+                        'count': stats['count'],
+                        'mean_ms': stats['total_ms'] / stats['count'] if stats['count'] else 0.0,
+                        'max_ms': stats['max_ms'],
+                    }
+                    for stage, stats in self._stats.items()
+                },
+            }
+
+    def _discard_executor(self, executor):
+        # Requests failing on the same broken pool only drop it once
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+face_pipeline = FacePipeline()
@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AttendanceLog
+
+
+##############################################################################################################################
+# Archive layout
+#
+#   ATTENDANCE_LOG_ARCHIVE_DIR/<YYYY-MM-DD>/part-<first id>-<last id>.ndjson.gz
+#
+# One directory per day (TIME_ZONE date of the log's timestamp), one gzipped
+# NDJSON file per archived chunk and day. Lines are ARCHIVED_FIELDS of one log,
+# in id order. A chunk that was written but not deleted (crash in between) is
+# selected again by the next run and, with the same chunk size, rewrites the
+# same files. With another chunk size its logs land in overlapping parts, and
+# until then they are both archived and in the table: readers skip ids they
+# have already yielded.
+
+ARCHIVED_FIELDS = ('id', 'student_id', 'course_id', 'session_id', 'timestamp', 'status', 'method', 'notes')
+
+
+def _archive_dir():
+    return Path(settings.ATTENDANCE_LOG_ARCHIVE_DIR)
+
+
+def _write_partition(day, rows):
+    path = _archive_dir() / day.isoformat() / f'part-{rows[0]["id"]:012d}-{rows[-1]["id"]:012d}.ndjson.gz'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb') as archive:
+                # isoformat() keeps the microseconds DjangoJSONEncoder would cut
+                lines = (json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}) + '\n' for row in rows)
+                archive.write(''.join(lines).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def archive_chunk(cutoff, chunk_size):
+    '''
+    Moves the (at most `chunk_size`) oldest logs before `cutoff` to the
+    archive: writes them to their day partitions, then deletes them from the
+    table in the same transaction. Returns the number of logs archived.
+    '''
+    with transaction.atomic():
+        rows = list(
+            AttendanceLog.objects.filter(timestamp__lt=cutoff)
+            .order_by('id')
+            .values(*ARCHIVED_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return 0
+
+        partitions = defaultdict(list)
+        for row in rows:
+            partitions[timezone.localdate(row['timestamp'])].append(row)
+        for day, day_rows in partitions.items():
+            _write_partition(day, day_rows)
+
+        AttendanceLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def read_archived_logs(course_id=None, start=None, end=None):
+    '''
+    Archived logs (dicts of ARCHIVED_FIELDS, timestamps parsed) of `course_id`
+    from day `start` to day `end` inclusive, oldest partition first. Only the
+    partitions of that date range are opened. A log found in several parts
+    is yielded once.
+    '''
+    root = _archive_dir()
+    if not root.is_dir():
+        return
+    seen = set()
+    for day_dir in sorted(root.iterdir()):
+        try:
+            day = date.fromisoformat(day_dir.name)
+        except ValueError:
+            continue
+        if (start and day < start) or (end and day > end):
+            continue
+        for path in sorted(day_dir.glob('part-*.ndjson.gz')):
+            with gzip.open(path, 'rt') as archive:
+                for line in archive:
+                    row = json.loads(line)
+                    if (course_id is None or row['course_id'] == course_id) and row['id'] not in seen:
+                        seen.add(row['id'])
+                        row['timestamp'] = parse_datetime(row['timestamp'])
+                        yield row
+
+
+def course_logs(course_id, start=None, end=None):
+    '''
+    All logs of a course between the days `start` and `end` (inclusive),
+    archived ones first, then the hot table's in timestamp order on the
+    (course, timestamp) index. Logs still in the table after being archived
+    are not repeated.
+    '''
+    archived = set()
+    for row in read_archived_logs(course_id, start, end):
+        archived.add(row['id'])
+        yield row
+
+    # Datetime bounds rather than timestamp__date, which would hide the
+    # column from the index
+    logs = AttendanceLog.objects.filter(course_id=course_id)
+    if start:
+        logs = logs.filter(timestamp__gte=timezone.make_aware(datetime.combine(start, time())))
+    if end:
+        logs = logs.filter(timestamp__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time())))
+    for row in logs.order_by('timestamp', 'id').values(*ARCHIVED_FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        if row['id'] not in archived:
+            yield row
@@ -0,0 +1,48 @@
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from app.log_archive import archive_chunk
+
+
+class Command(BaseCommand):
+    help = ('Moves attendance logs older than the retention period into gzipped NDJSON archives '
+            '(one directory per day under ATTENDANCE_LOG_ARCHIVE_DIR), a chunk per transaction')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ATTENDANCE_LOG_RETENTION_DAYS,
+            help='Archive logs older than this many days')
+        parser.add_argument('--before', help='Archive logs before this date (YYYY-MM-DD) instead')
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Number of logs archived and deleted per transaction')
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between chunks, leaves room for other writers')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            day = parse_date(options['before'])
+            if day is None:
+                raise CommandError('--before must be a date, YYYY-MM-DD')
+            cutoff = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        else:
+            cutoff = timezone.now() - timedelta(days=options['days'])
+
+        archived = 0
+        while True:
+            count = archive_chunk(cutoff, options['chunk_size'])
+            if not count:
+                break
+            archived += count
+            self.stdout.write(f'Archived {archived} attendance logs...')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} attendance logs older than {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Python's sqlite3 default, what the untuned backend runs with
+BASELINE_TIMEOUT = 5.0
+
+
+def _setup(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER NOT NULL, payload TEXT);
+        CREATE TABLE log (id INTEGER PRIMARY KEY, counter_id INTEGER NOT NULL, created REAL NOT NULL);
+    ''')
+    conn.executemany('INSERT INTO counters VALUES (?, 0, ?)', ((i, 'x' * 100) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def _worker(path, pragmas, begin, timeout, seconds, write_ratio, rows, seed, results):
+    '''
+    Runs a read/write mix for `seconds`. Writes are read-then-write
+    transactions, like a registration checking capacity and then incrementing it.
+    '''
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name}={value}')
+
+    reads = writes = errors = 0
+    write_latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        counter_id = rng.randrange(rows)
+        if rng.random() < write_ratio:
+            started = time.perf_counter()
+            try:
+                conn.execute(begin)
+                conn.execute('SELECT value FROM counters WHERE id = ?', (counter_id,)).fetchone()
+                conn.execute('UPDATE counters SET value = value + 1 WHERE id = ?', (counter_id,))
+                conn.execute('INSERT INTO log (counter_id, created) VALUES (?, ?)', (counter_id, time.time()))
+                conn.execute('COMMIT')
+                writes += 1
+                write_latencies.append(time.perf_counter() - started)
+            except sqlite3.OperationalError:
+                # 'database is locked', the request would have failed
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                errors += 1
+        else:
+            conn.execute(
+                'SELECT SUM(value), COUNT(*) FROM counters WHERE id BETWEEN ? AND ?',
+                (counter_id, counter_id + 100)).fetchone()
+            reads += 1
+    conn.close()
+    results.put((reads, writes, errors, write_latencies))
+
+
+def run_benchmark(processes, seconds, write_ratio, rows=10000):
+    '''
+    Mixed read/write throughput of several processes sharing one SQLite file,
+    with the stock configuration ('baseline') and with SQLITE_PRAGMAS plus
+    BEGIN IMMEDIATE ('tuned'). Returns {mode: stats}.
+    '''
+    modes = {
+        'baseline': ({}, 'BEGIN', BASELINE_TIMEOUT),
+        'tuned': (settings.SQLITE_PRAGMAS, 'BEGIN IMMEDIATE', settings.SQLITE_PRAGMAS['busy_timeout'] / 1000),
+    }
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    for mode, (pragmas, begin, timeout) in modes.items():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            _setup(path, rows)
+            results = context.Queue()
+            workers = [
+                context.Process(target=_worker, args=(
+                    path, pragmas, begin, timeout, seconds, write_ratio, rows, seed, results))
+                for seed in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            totals = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+        latencies = sorted(latency for *_, worker_latencies in totals for latency in worker_latencies)
+        reads = sum(total[0] for total in totals)
+        writes = sum(total[1] for total in totals)
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        report[mode] = {
+            'reads_per_s': reads / seconds,
+            'writes_per_s': writes / seconds,
+            'errors': sum(total[2] for total in totals),
+            'write_p50_ms': percentile(0.5),
+            'write_p99_ms': percentile(0.99),
+        }
+    return report
+
+
+class Command(BaseCommand):
+    help = ('Compares mixed read/write throughput of several processes on one SQLite file '
+            'with the stock settings and with SQLITE_PRAGMAS + BEGIN IMMEDIATE')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that write')
+
+    def handle(self, *args, **options):
+        report = run_benchmark(options['processes'], options['seconds'], options['write_ratio'])
+        self.stdout.write(f"{'mode':<10}{'reads/s':>12}{'writes/s':>12}{'errors':>10}{'write p50':>12}{'write p99':>12}")
+        for mode, stats in report.items():
+            self.stdout.write(
+                f"{mode:<10}{stats['reads_per_s']:>12,.0f}{stats['writes_per_s']:>12,.0f}{stats['errors']:>10}"
+                f"{stats['write_p50_ms']:>10.2f}ms{stats['write_p99_ms']:>10.2f}ms")
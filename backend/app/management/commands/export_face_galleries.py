@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app.face_gallery import export_course_gallery
+from app.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Exports the memory-mapped face gallery shard of every course roster (or the given courses)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Only export these courses')
+
+    def handle(self, *args, **options):
+        course_ids = options['course_ids'] or Course.objects.order_by('id').values_list('id', flat=True)
+        exported = 0
+        for course_id in course_ids:
+            path = export_course_gallery(course_id)
+            exported += 1
+            self.stdout.write(f'Exported {path}')
+        self.stdout.write(self.style.SUCCESS(f'Exported {exported} face gallery shards'))
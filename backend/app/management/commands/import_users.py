@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.provisioning import ImportFormatError, detect_format, open_text, provision_users, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Creates users in bulk from a CSV or NDJSON file with email, password, first_name, last_name, roll_no and role'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, '-' reads standard input")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows validated, hashed and inserted together (USER_IMPORT_CHUNK_SIZE)')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Password hashing processes (USER_IMPORT_WORKERS), 0 hashes inline')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            format = detect_format(path if path != '-' else '', options['format'])
+        except ImportFormatError as e:
+            raise CommandError(e)
+
+        def progress(processed, created):
+            self.stdout.write(f'Processed {processed} rows, created {created} users...')
+
+        try:
+            binary = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(e)
+        with open_text(binary) as stream:
+            summary = provision_users(
+                read_rows(stream, format), chunk_size=options['chunk_size'],
+                workers=options['workers'], progress=progress)
+
+        for skipped in summary['skipped']:
+            self.stderr.write(f"Line {skipped['line']} ({skipped['email']}): {skipped['reason']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['created']} users, skipped {len(summary['skipped'])} of {summary['processed']} rows"))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired outstanding and blacklisted refresh tokens in small transactions, '
+            'unlike flushexpiredtokens which deletes them all in one statement')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of outstanding tokens deleted per transaction')
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between chunks, leaves room for other writers')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        cutoff = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lte=cutoff).order_by('id')
+
+        purged_outstanding = purged_blacklisted = 0
+        last_id = 0
+        while True:
+            ids = list(expired.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            with transaction.atomic():
+                # Blacklist rows first so the outstanding delete has nothing to cascade to
+                blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                outstanding, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+            purged_blacklisted += blacklisted
+            purged_outstanding += outstanding
+            self.stdout.write(f'Purged {purged_outstanding} expired tokens...')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {purged_outstanding} outstanding and {purged_blacklisted} blacklisted expired tokens'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from app.models import User, StudentPerformanceRollup
+from app.performance import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the StudentPerformanceRollup row of every student in bulk, e.g. after an import'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of students whose reports are computed and upserted together')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        student_ids = User.objects.filter(role='student').order_by('id').values_list('id', flat=True)
+
+        rebuilt = 0
+        chunk = []
+        for student_id in student_ids.iterator(chunk_size=chunk_size):
+            chunk.append(student_id)
+            if len(chunk) == chunk_size:
+                rebuilt += len(refresh_rollups(chunk))
+                chunk = []
+                self.stdout.write(f'Rebuilt {rebuilt} rollups...')
+        if chunk:
+            rebuilt += len(refresh_rollups(chunk))
+
+        # Rollups of users that are no longer students
+        stale, _ = StudentPerformanceRollup.objects.exclude(student__role='student').delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rebuilt} performance rollups, removed {stale} stale rollups'))
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import ClubMembership
+from .permissions import forget_effective_roles
+from .resolvers import USER_ROLL_NO, resolve_many
+from .response_cache import bump_versions
+
+
+class BulkMembershipError(ValueError):
+    pass
+
+
+def clean_roll_numbers(roll_nos):
+    '''
+    The distinct roll numbers of a bulk request, in request order
+    '''
+    if not isinstance(roll_nos, list) or not roll_nos:
+        raise BulkMembershipError('user must be a non-empty list of roll numbers')
+    if not all(isinstance(roll_no, str) for roll_no in roll_nos):
+        raise BulkMembershipError('Roll numbers must be strings')
+    roll_nos = list(dict.fromkeys(roll_no.strip() for roll_no in roll_nos))
+    if len(roll_nos) > settings.CLUB_MEMBERSHIP_BULK_MAX_SIZE:
+        raise BulkMembershipError(
+            f'At most {settings.CLUB_MEMBERSHIP_BULK_MAX_SIZE} roll numbers per request')
+    return roll_nos
+
+
+def _report(outcomes):
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return {'results': outcomes, 'counts': counts}
+
+
+def add_members(club_id, roll_nos, role='member', member_status='active'):
+    '''
+    Adds the users with `roll_nos` to a club: one IN query resolves them, one
+    finds the existing members and one bulk insert adds the rest. Members
+    added concurrently make the insert fail and are reported as
+    'already_member' after a retry without them. Returns
+    {'results': {roll_no: 'added' | 'already_member' | 'not_found'}, 'counts'}.
+    '''
+    user_ids = resolve_many(USER_ROLL_NO, roll_nos)
+    with transaction.atomic():
+        existing = set(ClubMembership.objects.filter(
+            club_id=club_id, user_id__in=user_ids.values()).values_list('user_id', flat=True))
+        new = [
+            ClubMembership(club_id=club_id, user_id=user_id, role=role, status=member_status)
+            for user_id in user_ids.values() if user_id not in existing
+        ]
+        while new:
+            try:
+                with transaction.atomic():
+                    ClubMembership.objects.bulk_create(new)
+                break
+            except IntegrityError:
+                # Some were added concurrently, the (club, user) constraint
+                # rolled the insert back: they are members already, retry
+                # without them
+                added = set(ClubMembership.objects.filter(
+                    club_id=club_id, user_id__in=[membership.user_id for membership in new]
+                ).values_list('user_id', flat=True))
+                if not added:
+                    raise
+                existing |= added
+                new = [membership for membership in new if membership.user_id not in added]
+        if new:
+            # bulk_create sends no post_save, see app/signals.py
+            bump_versions(ClubMembership)
+            transaction.on_commit(lambda: bump_versions(ClubMembership))
+            forget_effective_roles(*(membership.user_id for membership in new))
+
+    outcomes = {}
+    for roll_no in roll_nos:
+        if roll_no not in user_ids:
+            outcomes[roll_no] = 'not_found'
+        elif user_ids[roll_no] in existing:
+            outcomes[roll_no] = 'already_member'
+        else:
+            outcomes[roll_no] = 'added'
+    return _report(outcomes)
+
+
+def remove_members(club_id, roll_nos):
+    '''
+    Removes the users with `roll_nos` from a club with one queryset delete,
+    its post_delete receivers (app/signals.py) drop the cached listings and
+    roles. Returns {'results': {roll_no: 'removed' | 'not_member' | 'not_found'},
+    'counts'}.
+    '''
+    user_ids = resolve_many(USER_ROLL_NO, roll_nos)
+    with transaction.atomic():
+        memberships = ClubMembership.objects.filter(club_id=club_id, user_id__in=user_ids.values())
+        removed = set(memberships.values_list('user_id', flat=True))
+        if removed:
+            memberships.delete()
+
+    outcomes = {}
+    for roll_no in roll_nos:
+        if roll_no not in user_ids:
+            outcomes[roll_no] = 'not_found'
+        elif user_ids[roll_no] in removed:
+            outcomes[roll_no] = 'removed'
+        else:
+            outcomes[roll_no] = 'not_member'
+    return _report(outcomes)
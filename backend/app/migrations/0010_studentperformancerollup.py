@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_alter_event_registration_deadline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentPerformanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_credits', models.IntegerField(default=0)),
+                ('weighted_points', models.FloatField(default=0)),
+                ('cgpa', models.FloatField(default=0)),
+                ('courses', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='performance_rollup', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
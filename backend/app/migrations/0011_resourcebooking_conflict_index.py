@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_studentperformancerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resourcebooking',
+            index=models.Index(fields=['resource', 'status', 'start_time', 'end_time'], name='booking_conflict_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 13:04
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_registered_count(apps, schema_editor):
+    Event = apps.get_model('app', 'Event')
+    EventRegistration = apps.get_model('app', 'EventRegistration')
+    registrations = (
+        EventRegistration.objects.filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    Event.objects.update(
+        registered_count=Coalesce(Subquery(registrations, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_resourcebooking_conflict_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='registered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_registered_count, migrations.RunPython.noop),
+    ]
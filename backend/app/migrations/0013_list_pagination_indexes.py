@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_event_registered_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='club',
+            index=models.Index(fields=['-created_at', '-id'], name='club_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clubmembership',
+            index=models.Index(fields=['-created_at', '-id'], name='membership_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clubmembership',
+            index=models.Index(fields=['club', '-created_at', '-id'], name='membership_club_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-created_at', '-id'], name='event_created_idx'),
+        ),
+    ]
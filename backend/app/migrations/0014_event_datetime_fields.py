@@ -0,0 +1,150 @@
+import logging
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+TIME_FIELDS = ('start_time', 'end_time', 'registration_deadline')
+
+
+def parse_event_time(value):
+    '''
+    Datetime of a legacy text value ('2025-05-05 10:00', ISO 8601 with or
+    without an offset, or a bare date), naive values are in TIME_ZONE
+    '''
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value.replace('Z', '+00:00'))
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time()) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+def convert_event_times(apps, schema_editor):
+    Event = apps.get_model('app', 'Event')
+    unparseable = []
+    last_id = 0
+    while True:
+        batch = list(Event.objects.filter(id__gt=last_id).order_by('id').only(
+            'id', 'created_at', *TIME_FIELDS)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for event in batch:
+            start = parse_event_time(event.start_time)
+            end = parse_event_time(event.end_time)
+            if start is None or end is None:
+                unparseable.append(event.id)
+            # Start and end are required, fall back to what is known (the
+            # other bound, else the creation time); these events are logged
+            event.start_time_new = start or end or event.created_at
+            event.end_time_new = end or event.start_time_new
+            event.registration_deadline_new = parse_event_time(event.registration_deadline)
+        Event.objects.bulk_update(batch, [f'{field}_new' for field in TIME_FIELDS])
+    if unparseable:
+        logger.warning('Events with unparseable start/end times, check them: %s', unparseable)
+
+
+def revert_event_times(apps, schema_editor):
+    Event = apps.get_model('app', 'Event')
+    last_id = 0
+    while True:
+        batch = list(Event.objects.filter(id__gt=last_id).order_by('id')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for event in batch:
+            for field in TIME_FIELDS:
+                value = getattr(event, f'{field}_new')
+                setattr(event, field, timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if value else None)
+        Event.objects.bulk_update(batch, list(TIME_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_list_pagination_indexes'),
+    ]
+
+    operations = [
+        # Nullable while both representations exist, also lets this be reversed
+        migrations.AlterField(
+            model_name='event',
+            name='start_time',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='end_time',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='start_time_new',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='end_time_new',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='registration_deadline_new',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(convert_event_times, revert_event_times),
+        migrations.RemoveField(
+            model_name='event',
+            name='start_time',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='end_time',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='registration_deadline',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='start_time_new',
+            new_name='start_time',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='end_time_new',
+            new_name='end_time',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='registration_deadline_new',
+            new_name='registration_deadline',
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='start_time',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='end_time',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_time'], name='event_start_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_event_datetime_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='roll_no',
+            field=models.CharField(blank=True, db_index=True, max_length=10, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_attendance_course_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='attendancelog',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['course', 'timestamp'], name='attlog_course_timestamp_idx'),
+        ),
+    ]
@@ -34,7 +34,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     first_name = models.CharField(max_length=100, blank=True, null=True)
     last_name = models.CharField(max_length=100, blank=True, null=True)
-    roll_no = models.CharField(max_length=10, blank=True, null=True)
+    roll_no = models.CharField(max_length=10, blank=True, null=True, db_index=True)
     email = models.EmailField(max_length=255, unique=True)
     profile_picture = models.CharField(max_length=255, blank=True, null=True)
     role = models.CharField(max_length=20, choices=ROLES)
@@ -69,6 +69,12 @@ class Club(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination, newest first
+            models.Index(fields=['-created_at', '-id'], name='club_created_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -95,6 +101,11 @@ class ClubMembership(models.Model):
 
     class Meta:
         unique_together = ('club', 'user')
+        indexes = [
+            # Keyset pagination, newest first
+            models.Index(fields=['-created_at', '-id'], name='membership_created_idx'),
+            models.Index(fields=['club', '-created_at', '-id'], name='membership_club_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} in {self.club.name}"
@@ -111,17 +122,27 @@ class Event(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
-    start_time = models.TextField()
-    end_time = models.TextField()
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
     location = models.CharField(max_length=255, blank=True, null=True)
     max_participants = models.IntegerField(blank=True, null=True)
-    registration_deadline = models.TextField(blank=True, null=True)
+    # Maintained by EventRegistrationView with conditional F() updates
+    registered_count = models.PositiveIntegerField(default=0)
+    registration_deadline = models.DateTimeField(blank=True, null=True)
     status = models.CharField(
         max_length=20, choices=STATUS_CHOICES, default='upcoming')
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination, newest first
+            models.Index(fields=['-created_at', '-id'], name='event_created_idx'),
+            # from/to windows of the event list
+            models.Index(fields=['start_time'], name='event_start_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -209,6 +230,12 @@ class ResourceBooking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Covers the overlap check done when creating a booking
+            models.Index(fields=['resource', 'status', 'start_time', 'end_time'], name='booking_conflict_idx'),
+        ]
+
     def __str__(self):
         return f"{self.resource.name} booked by {self.user.username}"
 
@@ -308,6 +335,22 @@ class GradeReport(models.Model):
         return f"{self.student.username}'s grade in {self.course.code}"
 
 
+class StudentPerformanceRollup(models.Model):
+    # Precomputed copy of the student performance report, kept up to date
+    # by the signals in app/signals.py
+    student = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name='performance_rollup')
+    total_credits = models.IntegerField(default=0)
+    weighted_points = models.FloatField(default=0)
+    cgpa = models.FloatField(default=0)
+    courses = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Performance rollup for {self.student.email}"
+
+
 class Attendance(models.Model):
     STATUS_CHOICES = [
         ('present', 'Present'),
@@ -331,6 +374,10 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('student', 'course', 'date')
+        indexes = [
+            # Course attendance reports, range scans over a course's dates
+            models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} on {self.date}"
@@ -431,8 +478,13 @@ class AttendanceLog(models.Model):
     )
     notes = models.TextField(blank=True, null=True)
 
+    # No default ordering, it would sort every query of this (large) table.
+    # Logs older than ATTENDANCE_LOG_RETENTION_DAYS are moved to gzipped
+    # archives by archive_attendance_logs, see app/log_archive.py.
     class Meta:
-        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['course', 'timestamp'], name='attlog_course_timestamp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.course.name} - {self.timestamp}"
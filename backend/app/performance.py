@@ -0,0 +1,181 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .db_routing import primary_reads
+from .models import (
+    User, StudentCourse, GradeReport, StudentAssessment, Attendance,
+    StudentPerformanceRollup
+)
+
+
+GRADE_POINTS = {
+    'A+': 10, 'A': 9, 'A-': 8.5,
+    'B+': 8, 'B': 7, 'B-': 6.5,
+    'C+': 6, 'C': 5, 'C-': 4.5,
+    'D': 4, 'F': 0
+}
+
+
+def build_performance_reports(student_ids):
+    '''
+    Builds the performance report (CGPA, credits and per course breakdown) for
+    every student in `student_ids` with a fixed number of queries, no matter how
+    many students, courses or assessments are involved:
+
+    1. active enrolments joined with their course
+    2. grade reports for those (student, course) pairs
+    3. assessment results joined with their assessment
+    4. attendance totals grouped by (student, course)
+
+    Returns a dict of student id ->
+    {'cgpa', 'total_credits', 'weighted_points', 'courses'}
+    '''
+    student_ids = list(student_ids)
+    enrolments = list(
+        StudentCourse.objects.filter(student_id__in=student_ids, status='active')
+        .select_related('course')
+        .order_by('student_id', 'pk')
+    )
+    course_ids = {sc.course_id for sc in enrolments}
+
+    # First grade report per (student, course), same as `.first()` did before
+    grades = {}
+    grade_reports = (
+        GradeReport.objects.filter(student_id__in=student_ids, course_id__in=course_ids)
+        .order_by('pk')
+        .values_list('student_id', 'course_id', 'grade')
+    )
+    for student_id, course_id, grade in grade_reports:
+        grades.setdefault((student_id, course_id), grade)
+
+    assessments = defaultdict(list)
+    student_assessments = (
+        StudentAssessment.objects.filter(
+            student_id__in=student_ids, assessment__course_id__in=course_ids)
+        .select_related('assessment')
+        .order_by('pk')
+    )
+    for sa in student_assessments:
+        assessment = sa.assessment
+        if sa.marks_obtained is not None and assessment.max_marks:
+            percentage = (sa.marks_obtained / assessment.max_marks) * 100
+        else:
+            percentage = None
+        assessments[(sa.student_id, assessment.course_id)].append({
+            'title': assessment.title,
+            'marks_obtained': sa.marks_obtained,
+            'max_marks': assessment.max_marks,
+            'percentage': percentage
+        })
+
+    attendance = {}
+    attendance_counts = (
+        Attendance.objects.filter(student_id__in=student_ids, course_id__in=course_ids)
+        .values('student_id', 'course_id')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(status='present')))
+        .order_by()
+    )
+    for row in attendance_counts:
+        attendance[(row['student_id'], row['course_id'])] = (row['total'], row['present'])
+
+    reports = {
+        student_id: {'cgpa': 0, 'total_credits': 0, 'weighted_points': 0, 'courses': []}
+        for student_id in student_ids
+    }
+    for sc in enrolments:
+        course = sc.course
+        key = (sc.student_id, sc.course_id)
+        report = reports[sc.student_id]
+
+        total_classes, present_count = attendance.get(key, (0, 0))
+        attendance_percentage = (
+            present_count / total_classes * 100) if total_classes > 0 else 0
+
+        # Calculate GPA contribution
+        grade = grades.get(key)
+        if grade is not None:
+            grade_point = GRADE_POINTS.get(grade, 0)
+            report['weighted_points'] += grade_point * course.credits
+            report['total_credits'] += course.credits
+        else:
+            grade = 'N/A'
+            grade_point = 0
+
+        report['courses'].append({
+            'course_code': course.code,
+            'course_name': course.name,
+            'credits': course.credits,
+            'grade': grade,
+            'grade_point': grade_point,
+            'attendance_percentage': attendance_percentage,
+            'assessments': assessments.get(key, [])
+        })
+
+    for report in reports.values():
+        total_credits = report['total_credits']
+        cgpa = (report['weighted_points'] / total_credits) if total_credits > 0 else 0
+        report['cgpa'] = round(cgpa, 2)
+
+    return reports
+
+
+def build_performance_report(student_id):
+    '''
+    Performance report for a single student, see `build_performance_reports`
+    '''
+    return build_performance_reports([student_id])[student_id]
+
+
+def refresh_rollups(student_ids):
+    '''
+    Recomputes and upserts the StudentPerformanceRollup rows of `student_ids`.
+    Runs the same fixed set of queries as `build_performance_reports` plus one
+    bulk upsert, so it can be called for one student or a whole batch.
+    '''
+    # Computed from the primary, a lagging replica would persist stale reports
+    with primary_reads():
+        # Students may have been deleted by the time a deferred refresh runs
+        student_ids = list(User.objects.filter(id__in=set(student_ids)).values_list('id', flat=True))
+        if not student_ids:
+            return []
+        reports = build_performance_reports(student_ids)
+
+    rollups = [
+        StudentPerformanceRollup(
+            student_id=student_id,
+            total_credits=report['total_credits'],
+            weighted_points=report['weighted_points'],
+            cgpa=report['cgpa'],
+            courses=report['courses'],
+        )
+        for student_id, report in reports.items()
+    ]
+    return StudentPerformanceRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=['total_credits', 'weighted_points', 'cgpa', 'courses', 'updated_at'],
+    )
+
+
+def schedule_rollup_refresh(student_ids):
+    '''
+    Refreshes the rollups once the current transaction commits, so a write
+    that is rolled back never reaches the rollup table
+    '''
+    student_ids = set(student_ids)
+    if student_ids:
+        transaction.on_commit(lambda: refresh_rollups(student_ids))
+
+
+def get_performance_rollup(student_id):
+    '''
+    Returns the rollup row of a student, building it on first access
+    '''
+    rollup = StudentPerformanceRollup.objects.filter(student_id=student_id).first()
+    if rollup is None:
+        refresh_rollups([student_id])
+        rollup = StudentPerformanceRollup.objects.get(student_id=student_id)
+    return rollup
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .models import ClubMembership
+
+
+# Global roles that manage every club
+CLUB_MANAGER_ROLES = ('faculty', 'admin')
+
+
+class EffectiveRoles:
+    '''
+    What a user may do: their global role plus the ids of the clubs they
+    coordinate (an active ClubMembership with role 'coordinator')
+    '''
+    def __init__(self, role, coordinated_club_ids):
+        self.role = role
+        self.coordinated_club_ids = frozenset(coordinated_club_ids)
+
+    @property
+    def manages_all_clubs(self):
+        return self.role in CLUB_MANAGER_ROLES
+
+    def can_manage_club(self, club_id):
+        return self.manages_all_clubs or club_id in self.coordinated_club_ids
+
+    def can_manage_any_club(self):
+        return self.manages_all_clubs or bool(self.coordinated_club_ids)
+
+
+def _roles_key(user_id):
+    return f'perm:coordinated-clubs:{user_id}'
+
+
+def coordinated_club_ids(user_id):
+    '''
+    Ids of the clubs `user_id` coordinates, cached for PERMISSION_CACHE_TIMEOUT
+    seconds and dropped by app/signals.py when their memberships change. The
+    cache has to be shared by every server process for the other processes to
+    see that (app/apps.py refuses to start otherwise).
+    '''
+    key = _roles_key(user_id)
+    club_ids = cache.get(key)
+    if club_ids is None:
+        club_ids = list(ClubMembership.objects.filter(
+            user_id=user_id, role='coordinator', status='active').values_list('club_id', flat=True))
+        cache.set(key, club_ids, timeout=settings.PERMISSION_CACHE_TIMEOUT)
+    return club_ids
+
+
+def forget_effective_roles(*user_ids):
+    # Dropped again after commit, a concurrent read could have cached the
+    # memberships as they were before the transaction
+    keys = [_roles_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def effective_roles(request):
+    '''
+    EffectiveRoles of the requesting user, loaded once per request. The
+    global role comes from the token claims, see app/authentication.py.
+    '''
+    roles = getattr(request, '_effective_roles', None)
+    if roles is None:
+        user = request.user
+        if not user or not user.is_authenticated:
+            roles = EffectiveRoles(None, ())
+        else:
+            roles = EffectiveRoles(user.role, coordinated_club_ids(user.id))
+        request._effective_roles = roles
+    return roles
+
+
+class CanManageClub(BasePermission):
+    '''
+    Reads are allowed. Writes need a role in CLUB_MANAGER_ROLES or to
+    coordinate the club concerned: the one returned by the view's
+    `get_permission_club_id(request)`, if it names one, and the club of the
+    object passed to `check_object_permissions`.
+    '''
+    message = 'Only faculty or the coordinators of this club can do this'
+
+    def has_permission(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        roles = effective_roles(request)
+        get_club_id = getattr(view, 'get_permission_club_id', None)
+        club_id = get_club_id(request) if get_club_id else None
+        if club_id is None:
+            return roles.can_manage_any_club()
+        return roles.can_manage_club(club_id)
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS:
+            return True
+        return effective_roles(request).can_manage_club(obj.club_id)
@@ -0,0 +1,273 @@
+import csv
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+
+from .models import User
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('email', 'password', 'first_name', 'last_name', 'roll_no', 'role')
+ROLES = {role for role, _ in User.ROLES}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(name, requested=None):
+    '''
+    Format named explicitly, or guessed from a file name's extension
+    '''
+    if requested:
+        if requested not in FORMATS:
+            raise ImportFormatError(f'Unknown format {requested!r}, expected one of {", ".join(FORMATS)}')
+        return requested
+    extension = os.path.splitext(name or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    raise ImportFormatError('Cannot tell the format from the file name, pass csv or ndjson explicitly')
+
+
+def read_rows(stream, format):
+    '''
+    Yields (line number, row dict) from a text stream without loading it whole.
+    Lines that cannot be parsed are yielded with a None row.
+    '''
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def _clean_row(row):
+    '''
+    Returns the normalized field values of an import row, raises ValidationError
+    '''
+    if row is None:
+        raise ValidationError('Malformed row')
+    values = {field: (str(row.get(field) or '').strip() or None) for field in IMPORT_FIELDS}
+    if not values['email']:
+        raise ValidationError('Email is required')
+    values['email'] = User.objects.normalize_email(values['email'])
+    validate_email(values['email'])
+    values['role'] = values['role'] or 'student'
+    if values['role'] not in ROLES:
+        raise ValidationError(f'Unknown role {values["role"]!r}')
+    for field in ('first_name', 'last_name', 'roll_no'):
+        max_length = User._meta.get_field(field).max_length
+        if values[field] and len(values[field]) > max_length:
+            raise ValidationError(f'{field} is longer than {max_length} characters')
+    # Imports refuse short passwords, rows without one get an unusable password
+    if values['password'] is not None and len(values['password']) < 6:
+        raise ValidationError('Password must be at least 6 characters')
+    return values
+
+
+def _init_worker():
+    # Spawned workers start without Django configured
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor():
+    '''
+    The USER_IMPORT_WORKERS process pool every import of this process hashes
+    in, started on first use. Concurrent imports queue on it rather than each
+    starting its own.
+    '''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.USER_IMPORT_WORKERS, initializer=_init_worker)
+        return _executor
+
+
+def _hash_passwords(executor, workers, passwords):
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    # A few batches per worker keeps them all busy without a round trip per password
+    batch = max(len(passwords) // (4 * workers), 1)
+    return list(executor.map(make_password, passwords, chunksize=batch))
+
+
+def iter_provision_users(rows, chunk_size=None, workers=None):
+    '''
+    Creates users from an iterable of (line number, row dict) as produced by
+    `read_rows`. Rows are validated and deduplicated on email and roll_no,
+    within the import and against existing users, then their passwords are
+    hashed in a process pool (PBKDF2 is CPU bound and dominates the cost) and
+    the chunk is inserted with one bulk_create. The pool is the shared one
+    unless `workers` asks for a pool of another size, which is started for
+    this import only.
+
+    Yields the running summary after every chunk: {'processed', 'created',
+    'skipped': [{'line', 'email', 'reason'}, ...]}.
+    '''
+    chunk_size = chunk_size or settings.USER_IMPORT_CHUNK_SIZE
+    own_executor = workers is not None and workers != settings.USER_IMPORT_WORKERS
+    if workers is None:
+        workers = settings.USER_IMPORT_WORKERS
+    if not workers:
+        executor = None
+    elif own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    else:
+        executor = _shared_executor()
+
+    summary = {'processed': 0, 'created': 0, 'skipped': []}
+    seen_emails = set()
+    seen_roll_nos = set()
+    rows = iter(rows)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            candidates = []
+            for line_no, row in chunk:
+                try:
+                    values = _clean_row(row)
+                except ValidationError as e:
+                    email = row.get('email') if isinstance(row, dict) else None
+                    summary['skipped'].append({'line': line_no, 'email': email, 'reason': ' '.join(e.messages)})
+                    continue
+                if values['email'] in seen_emails:
+                    reason = 'Duplicate email in import'
+                elif values['roll_no'] and values['roll_no'] in seen_roll_nos:
+                    reason = 'Duplicate roll number in import'
+                else:
+                    reason = None
+                    candidates.append((line_no, values))
+                seen_emails.add(values['email'])
+                if values['roll_no']:
+                    seen_roll_nos.add(values['roll_no'])
+                if reason:
+                    summary['skipped'].append({'line': line_no, 'email': values['email'], 'reason': reason})
+
+            existing_emails = set(User.objects.filter(
+                email__in=[values['email'] for _, values in candidates]).values_list('email', flat=True))
+            existing_roll_nos = set(User.objects.filter(
+                roll_no__in=[values['roll_no'] for _, values in candidates if values['roll_no']]
+            ).values_list('roll_no', flat=True))
+
+            new_users = []
+            for line_no, values in candidates:
+                if values['email'] in existing_emails:
+                    summary['skipped'].append({'line': line_no, 'email': values['email'], 'reason': 'Email already registered'})
+                elif values['roll_no'] in existing_roll_nos:
+                    summary['skipped'].append({'line': line_no, 'email': values['email'], 'reason': 'Roll number already registered'})
+                else:
+                    new_users.append((line_no, values))
+
+            passwords = _hash_passwords(executor, workers, [values.pop('password') for _, values in new_users])
+            users = [User(password=password, **values) for password, (_, values) in zip(passwords, new_users)]
+            with transaction.atomic():
+                # A user registering concurrently loses nothing, their row wins
+                User.objects.bulk_create(users, ignore_conflicts=True)
+                # Rows the conflicts dropped do not carry our (salted, so
+                # unique) password hash
+                landed = set(User.objects.filter(
+                    email__in=[user.email for user in users]).values_list('email', 'password'))
+
+            for (line_no, _), user in zip(new_users, users):
+                if (user.email, user.password) in landed:
+                    summary['created'] += 1
+                else:
+                    summary['skipped'].append({'line': line_no, 'email': user.email, 'reason': 'Registered during import'})
+            summary['processed'] += len(chunk)
+            yield summary
+    finally:
+        if own_executor and executor is not None:
+            executor.shutdown()
+
+
+def provision_users(rows, chunk_size=None, workers=None, progress=None):
+    '''
+    Runs `iter_provision_users` to completion, calling `progress(processed,
+    created)` after every chunk. Returns the final summary.
+    '''
+    summary = {'processed': 0, 'created': 0, 'skipped': []}
+    for summary in iter_provision_users(rows, chunk_size, workers):
+        if progress is not None:
+            progress(summary['processed'], summary['created'])
+    return summary
+
+
+def import_in_background(binary, format):
+    '''
+    Copies the uploaded `binary` file and imports it with `provision_users` in
+    a thread of its own, so the import runs to the end whether or not anyone
+    keeps reading. Returns an iterator of its progress events: {'processed',
+    'created'} after every chunk, then {'done': True, **summary}, or
+    {'done': True, 'error'} if it failed.
+    '''
+    # The request closes its uploads once the response is finished
+    copy = tempfile.TemporaryFile()
+    shutil.copyfileobj(binary, copy)
+    copy.seek(0)
+    events = queue.Queue()
+
+    def progress(processed, created):
+        events.put({'processed': processed, 'created': created})
+
+    def run():
+        try:
+            with open_text(copy) as stream:
+                summary = provision_users(read_rows(stream, format), progress=progress)
+            events.put({'done': True, **summary})
+        except Exception:
+            logger.exception('User import failed')
+            events.put({'done': True, 'error': 'Import failed'})
+        finally:
+            # Threads get a database connection of their own
+            connection.close()
+
+    threading.Thread(target=run, name='user-import').start()
+
+    def iter_events():
+        while True:
+            event = events.get()
+            yield event
+            if event.get('done'):
+                return
+    return iter_events()
+
+
+def open_text(binary, encoding='utf-8-sig'):
+    '''
+    Text view of an uploaded or opened binary file, decoded as it is read
+    '''
+    return io.TextIOWrapper(binary, encoding=encoding, newline='')
@@ -0,0 +1,164 @@
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Club, User
+
+
+# Natural keys the API accepts in place of primary keys
+CLUB_NAME = (Club, 'name')
+USER_ROLL_NO = (User, 'roll_no')
+NATURAL_KEYS = (CLUB_NAME, USER_ROLL_NO)
+
+# {(model label, field, value): pk} of the current request
+_identity_map = contextvars.ContextVar('resolver_identity_map', default=None)
+
+
+class ResolverCache:
+    '''
+    Process wide natural key -> pk map, entries live RESOLVER_CACHE_TTL
+    seconds. Renames in this process evict immediately (app/signals.py), in
+    other processes the TTL bounds how long an old name keeps resolving.
+    '''
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    found[key] = entry[0]
+        return found
+
+    def set_many(self, mapping):
+        expires = time.monotonic() + settings.RESOLVER_CACHE_TTL
+        with self._lock:
+            if len(self._entries) + len(mapping) > settings.RESOLVER_CACHE_SIZE:
+                now = time.monotonic()
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+                if len(self._entries) + len(mapping) > settings.RESOLVER_CACHE_SIZE:
+                    self._entries.clear()
+            for key, pk in mapping.items():
+                self._entries[key] = (pk, expires)
+
+    def invalidate(self, model, pk, keys=()):
+        '''
+        Drops the entries of `model` resolving to `pk`, and the `keys`
+        '''
+        label = model._meta.label_lower
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if key[0] == label and entry[0] == pk]:
+                del self._entries[key]
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+resolver_cache = ResolverCache()
+
+
+def resolve_many(natural_key, values):
+    '''
+    {value: pk} for the `values` of a natural key (CLUB_NAME, USER_ROLL_NO)
+    that match exactly one row, looked up in the request's identity map, then
+    the process cache, then with one query for the rest
+    '''
+    model, field = natural_key
+    label = model._meta.label_lower
+    keys = {(label, field, value): value for value in values if value not in (None, '')}
+
+    identity_map = _identity_map.get()
+    resolved = {}
+    if identity_map is not None:
+        resolved.update({key: identity_map[key] for key in keys if key in identity_map})
+    resolved.update(resolver_cache.get_many([key for key in keys if key not in resolved]))
+
+    missing = [value for key, value in keys.items() if key not in resolved]
+    if missing:
+        rows = model.objects.filter(**{f'{field}__in': missing}).values_list(field, 'pk')
+        fetched = {}
+        ambiguous = set()
+        for value, pk in rows:
+            key = (label, field, value)
+            if key in fetched:
+                # Not unique (roll_no), refuse to guess
+                ambiguous.add(key)
+            fetched[key] = pk
+        for key in ambiguous:
+            del fetched[key]
+        resolver_cache.set_many(fetched)
+        resolved.update(fetched)
+
+    if identity_map is not None:
+        identity_map.update(resolved)
+    return {keys[key]: pk for key, pk in resolved.items()}
+
+
+def forget(instance):
+    '''
+    Drops from the process cache and the current identity map the natural
+    keys resolving to a saved/deleted row, it may have been renamed, and
+    those of its current values, another row may have held them (a roll_no
+    now shared is ambiguous)
+    '''
+    model = type(instance)
+    label = model._meta.label_lower
+    keys = [(label, field, getattr(instance, field)) for key_model, field in NATURAL_KEYS if key_model is model]
+    resolver_cache.invalidate(model, instance.pk, keys)
+    identity_map = _identity_map.get()
+    if identity_map:
+        for key in [key for key, value in identity_map.items()
+                    if key in keys or (key[0] == label and value == instance.pk)]:
+            del identity_map[key]
+
+
+def resolve(natural_key, value):
+    '''
+    pk of the single row with that natural key value, raises the model's
+    DoesNotExist when there is none (or more than one)
+    '''
+    model, field = natural_key
+    try:
+        return resolve_many(natural_key, [value])[value]
+    except KeyError:
+        raise model.DoesNotExist(f'No {model._meta.verbose_name} with {field} {value!r}')
+
+
+def resolve_club_id(name):
+    return resolve(CLUB_NAME, name)
+
+
+def resolve_user_id(roll_no):
+    return resolve(USER_ROLL_NO, roll_no)
+
+
+def resolve_membership_keys(club_name, roll_no):
+    '''
+    (club id, user id) of a membership addressed by club name and roll number
+    '''
+    return resolve_club_id(club_name), resolve_user_id(roll_no)
+
+
+class IdentityMapMiddleware:
+    '''
+    Gives every request its own identity map, so a natural key is resolved
+    at most once per request
+    '''
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _identity_map.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _identity_map.reset(token)
@@ -0,0 +1,128 @@
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import is_process_local
+
+
+# Response headers that are part of a cached list page
+CACHED_HEADERS = ('X-Next-Cursor', 'Link', 'ETag', 'Last-Modified')
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def response_cache_enabled():
+    '''
+    Whether responses are cached: a write only bumps the versions of its own
+    process, so a process local cache shared by several processes would
+    serve stale lists indefinitely
+    '''
+    return settings.SINGLE_PROCESS or not is_process_local(settings.RESPONSE_CACHE_ALIAS)
+
+
+def _version_key(model):
+    return f'rc:version:{model._meta.label_lower}'
+
+
+def bump_versions(*models):
+    '''
+    Invalidates every cached response that depends on `models`
+    '''
+    cache = _cache()
+    for model in models:
+        key = _version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Unknown or evicted, a fresh timestamp can't collide with old keys
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def _versions(models):
+    cache = _cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+class ResponseCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**counts, 'hit_rate': counts['hits'] / (counts['hits'] + counts['misses'])}
+                for name, counts in self._counts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+def cached_response(*models):
+    '''
+    Caches successful responses of a GET view method per path and query
+    string. The key embeds the current version of every model in `models`,
+    which app/signals.py bumps on save/delete, so a write makes the old
+    entries unreachable (they expire after RESPONSE_CACHE_TIMEOUT).
+    Responses must not depend on who is asking. Off (the view always runs)
+    unless `response_cache_enabled()`.
+    '''
+    def decorator(view_method):
+        name = view_method.__qualname__.split('.')[0]
+
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            if not response_cache_enabled():
+                return view_method(view, request, *args, **kwargs)
+            query = '&'.join(sorted(request.GET.urlencode().split('&')))
+            digest = hashlib.blake2b(f'{request.path}?{query}'.encode(), digest_size=16).hexdigest()
+            versions = '.'.join(str(version) for version in _versions(models))
+            key = f'rc:{name}:{versions}:{digest}'
+
+            cache = _cache()
+            cached = cache.get(key)
+            if cached is not None:
+                response_cache_stats.record(name, hit=True)
+                response = None
+                if 'ETag' in cached['headers']:
+                    response = get_conditional_response(request, etag=cached['headers']['ETag'])
+                if response is None:
+                    response = Response(cached['data'], headers=cached['headers'])
+                response['X-Cache'] = 'hit'
+                return response
+
+            response_cache_stats.record(name, hit=False)
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {header: response[header] for header in CACHED_HEADERS if header in response}
+                cache.set(key, {'data': response.data, 'headers': headers}, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
@@ -23,6 +23,45 @@ from .models import (
 )
 
 
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that takes an extra `fields` argument naming the subset of
+    fields to output (used for sparse fieldsets, e.g. ?fields=id,title), and an
+    `expand` argument naming relations of `Meta.expandable` to embed instead of
+    their id (e.g. ?expand=user,club).
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+        for field_name in expand or ():
+            if field_name in self.fields:
+                self.fields[field_name] = self.Meta.expandable[field_name](read_only=True)
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    The fields of a user embedded in expanded listings.
+    """
+    class Meta:
+        model = User
+        fields = ['id', 'first_name', 'last_name', 'roll_no', 'email']
+
+
+class ClubSummarySerializer(serializers.ModelSerializer):
+    """
+    The fields of a club embedded in expanded listings.
+    """
+    class Meta:
+        model = Club
+        fields = ['id', 'name', 'status']
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer for User model to handle user registration and management.
@@ -145,7 +184,7 @@ class ResourceSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Resource
-        fields = ['id', 'name', 'resource_type', 'capacity', 'location', 'status']
+        fields = ['id', 'name', 'type', 'capacity', 'location', 'status']
 
 
 class ResourceBookingSerializer(serializers.ModelSerializer):
@@ -162,11 +201,11 @@ class ResourceBookingSerializer(serializers.ModelSerializer):
         """
         Automatically assigns the logged-in user to the resource booking.
         """
-        validated_data['user'] = self.context['request'].user
+        validated_data['user_id'] = self.context['request'].user.id
         return super().create(validated_data)
 
 
-class ClubSerializer(serializers.ModelSerializer):
+class ClubSerializer(DynamicFieldsModelSerializer):
     """
     Serializer for Club model to represent the details of a club including its name, description,
     logo, and faculty advisor.
@@ -176,7 +215,7 @@ class ClubSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'logo', 'creation_date', 'status', 'faculty_advisor']
 
 
-class ClubMembershipSerializer(serializers.ModelSerializer):
+class ClubMembershipSerializer(DynamicFieldsModelSerializer):
     """
     Serializer for ClubMembership model to represent the relationship between users and clubs,
     including membership roles and status.
@@ -184,16 +223,22 @@ class ClubMembershipSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClubMembership
         fields = ['id', 'club', 'user', 'role', 'join_date', 'status']
+        expandable = {'club': ClubSummarySerializer, 'user': UserSummarySerializer}
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(DynamicFieldsModelSerializer):
     """
     Serializer for Event model to manage event details such as club association, title, description,
-    date, location, and registration deadline.
+    start and end time, location, and registration deadline.
     """
     class Meta:
         model = Event
-        fields = ['id', 'club', 'title', 'description', 'date', 'location', 'registration_deadline', 'max_participants']
+        fields = [
+            'id', 'club', 'title', 'description', 'start_time', 'end_time', 'location',
+            'registration_deadline', 'max_participants', 'registered_count', 'status',
+        ]
+        read_only_fields = ['registered_count']
+        expandable = {'club': ClubSummarySerializer}
 
 
 class EventRegistrationSerializer(serializers.ModelSerializer):
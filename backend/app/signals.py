@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    User, Course, StudentCourse, Assessment, StudentAssessment, GradeReport, Attendance,
+    FacialRecognitionData, Club, ClubMembership, Event, EventRegistration
+)
+from .authentication import USER_CLAIMS, mark_claims_stale, user_cache
+from .events import release_event_seat
+from .face_gallery import gallery_cache, schedule_gallery_export
+from .performance import schedule_rollup_refresh
+from .permissions import forget_effective_roles
+from .resolvers import forget
+from .response_cache import bump_versions
+
+
+##############################################################################################################################
+# Student performance rollups
+@receiver([post_save, post_delete], sender=GradeReport)
+@receiver([post_save, post_delete], sender=StudentAssessment)
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=StudentCourse)
+def refresh_student_rollup(sender, instance, **kwargs):
+    schedule_rollup_refresh([instance.student_id])
+
+
+@receiver(post_save, sender=Course)
+@receiver([post_save, post_delete], sender=Assessment)
+def refresh_course_rollups(sender, instance, **kwargs):
+    # Course name/credits and assessment titles/max marks are copied into the
+    # rollups of every student enrolled in the course
+    course_id = instance.pk if sender is Course else instance.course_id
+    schedule_rollup_refresh(
+        StudentCourse.objects.filter(course_id=course_id).values_list('student_id', flat=True)
+    )
+
+
+##############################################################################################################################
+# Face galleries
+@receiver([post_save, post_delete], sender=StudentCourse)
+def rebuild_roster_gallery(sender, instance, **kwargs):
+    # (Re-)enrolments and drops change who is in the course shard
+    gallery_cache.invalidate_course(instance.course_id)
+    schedule_gallery_export([instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=FacialRecognitionData)
+def rebuild_user_galleries(sender, instance, **kwargs):
+    # New encodings or a status change away from 'active' affect every shard
+    # the user is part of
+    course_ids = list(StudentCourse.objects.filter(
+        student_id=instance.user_id, status='active').values_list('course_id', flat=True))
+    for course_id in course_ids:
+        gallery_cache.invalidate_course(course_id)
+    schedule_gallery_export(course_ids)
+
+
+##############################################################################################################################
+# Event registrations
+@receiver(post_delete, sender=EventRegistration)
+def release_registration_seat(sender, instance, **kwargs):
+    release_event_seat(instance.event_id)
+
+
+##############################################################################################################################
+# Token claims and the user cache
+@receiver(pre_save, sender=User)
+def detect_claim_changes(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._claims_changed = False
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*USER_CLAIMS).first()
+    instance._claims_changed = previous is not None and any(
+        previous[claim] != getattr(instance, claim) for claim in USER_CLAIMS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # Role changes and deactivations must not be served from old tokens
+    if kwargs['signal'] is post_delete or getattr(instance, '_claims_changed', False):
+        mark_claims_stale(instance.pk)
+
+
+##############################################################################################################################
+# Coordinated clubs of the permission checks
+@receiver([post_save, post_delete], sender=ClubMembership)
+def forget_coordinated_clubs(sender, instance, **kwargs):
+    forget_effective_roles(instance.user_id)
+
+
+##############################################################################################################################
+# Response cache versions
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=Club)
+@receiver([post_save, post_delete], sender=ClubMembership)
+@receiver([post_save, post_delete], sender=User)
+def bump_response_cache_version(sender, instance, **kwargs):
+    # Bumped again after commit, a miss running concurrently with the
+    # transaction could have cached the old rows under the first new version
+    bump_versions(sender)
+    transaction.on_commit(lambda: bump_versions(sender))
+
+
+##############################################################################################################################
+# Natural key resolvers
+@receiver([post_save, post_delete], sender=Club)
+@receiver([post_save, post_delete], sender=User)
+def forget_natural_keys(sender, instance, **kwargs):
+    forget(instance)
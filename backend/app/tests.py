@@ -1,3 +1,1950 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import (
+    User, Course, StudentCourse, Assessment, StudentAssessment, GradeReport,
+    Attendance, StudentPerformanceRollup, AttendanceSession, AttendanceLog,
+    FacialRecognitionData, Resource, ResourceBooking, Club, ClubMembership, Event, EventRegistration
+)
+from .authentication import ClaimsRefreshToken, user_cache
+from .caching import require_shared_cache
+from .management.commands.benchmark_sqlite import run_benchmark
+from .face_gallery import (
+    GalleryFormatError, gallery_cache, open_shard, shard_path, write_shard
+)
+from .face_matching import RosterGallery, image_to_encoding, encode_encoding, encoding_dim
+from .db_routing import (
+    STICKY_COOKIE, PrimaryReplicaRouter, ReplicaStickinessMiddleware, primary_reads, replica_reads, routing_state
+)
+from .events import filter_event_window
+from .exports import EXPORTS, stream_export
+from .log_archive import archive_chunk, course_logs, read_archived_logs
+from .face_pipeline import FacePipeline, InvalidImage, PipelineBusy
+from .performance import get_performance_rollup
+from .attendance_report import course_attendance_report
+from . import provisioning
+from .memberships import add_members
+from .permissions import coordinated_club_ids
+from .resolvers import CLUB_NAME, resolve_club_id, resolve_many, resolve_user_id, resolver_cache
+from .response_cache import response_cache_stats
+from .token_blacklist import BloomFilter, blacklist_filter
+
+
+def make_user(email, role='student', password=None, **extra):
+    # Without a password no (slow) hashing happens, tests use force_authenticate
+    return User.objects.create_user(email=email, password=password, role=role, **extra)
+
+
+def make_course(code, faculty=None, credits=4):
+    return Course.objects.create(
+        code=code, name=f'Course {code}', credits=credits,
+        semester='odd', department='CSE', faculty=faculty
+    )
+
+
+def enrol_with_records(student, num_courses, num_assessments, num_days=3):
+    '''
+    Enrols `student` in `num_courses` courses, each with `num_assessments`
+    graded assessments, a grade report and `num_days` attendance records
+    '''
+    start = date(2025, 1, 1)
+    for i in range(num_courses):
+        course = make_course(f'C{student.id}-{i}')
+        StudentCourse.objects.create(student=student, course=course, semester='odd', year=2025)
+        GradeReport.objects.create(
+            student=student, course=course, semester='odd', year=2025, grade='A', gpa=4.0)
+        for j in range(num_assessments):
+            assessment = Assessment.objects.create(course=course, title=f'Quiz {j}', max_marks=20)
+            StudentAssessment.objects.create(student=student, assessment=assessment, marks_obtained=15)
+        for d in range(num_days):
+            Attendance.objects.create(
+                student=student, course=course, date=start + timedelta(days=d),
+                status='present' if d % 3 else 'absent')
+
+
+class TempGalleryDirMixin:
+    '''
+    Points FACE_GALLERY_DIR at a throwaway directory for each test
+    '''
+    def setUp(self):
+        super().setUp()
+        gallery_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, gallery_dir)
+        settings_override = override_settings(FACE_GALLERY_DIR=gallery_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        gallery_cache.clear()
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.student = make_user('claims@example.com', first_name='Ada', last_name='Lovelace')
+
+    def get(self, url, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        user_queries = [query['sql'] for query in queries if 'FROM "app_user"' in query['sql']]
+        return response, user_queries
+
+    def test_claims_token_skips_user_query(self):
+        response, user_queries = self.get('/api/events/', ClaimsRefreshToken.for_user(self.student))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_queries, [])
+
+    def test_full_user_is_cached(self):
+        get_performance_rollup(self.student.id)
+        token = ClaimsRefreshToken.for_user(self.student)
+        response, user_queries = self.get('/api/student/performance/', token)
+        self.assertEqual(response.json()['student']['name'], 'Ada Lovelace')
+        self.assertEqual(len(user_queries), 1)
+        response, user_queries = self.get('/api/student/performance/', token)
+        self.assertEqual(user_queries, [])
+
+        self.student.first_name = 'Augusta'
+        self.student.save()
+        response, user_queries = self.get('/api/student/performance/', token)
+        self.assertEqual(response.json()['student']['name'], 'Augusta Lovelace')
+
+    def test_role_change_and_deactivation_invalidate_claims(self):
+        token = ClaimsRefreshToken.for_user(self.student)
+        self.student.role = 'faculty'
+        self.student.save()
+        response, user_queries = self.get('/api/student/performance/', token)
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(user_queries)
+
+        self.student.is_active = False
+        self.student.save()
+        response, _ = self.get('/api/events/', token)
+        self.assertEqual(response.status_code, 401)
+
+    def test_several_processes_need_a_shared_cache(self):
+        with override_settings(SINGLE_PROCESS=False):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'ClaimsJWTAuthentication'):
+                require_shared_cache('ClaimsJWTAuthentication')
+            cache_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, cache_dir)
+            file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}
+            with override_settings(CACHES={'default': file_cache}):
+                require_shared_cache('ClaimsJWTAuthentication')
+        require_shared_cache('ClaimsJWTAuthentication')
+
+    def test_tokens_without_claims_still_work(self):
+        response, user_queries = self.get('/api/events/', RefreshToken.for_user(self.student))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        blacklist_filter.reset()
+        self.client = APIClient()
+        self.student = make_user('blacklist@example.com')
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh_token': str(token)}, format='json')
+
+    def test_valid_refresh_skips_blacklist_table(self):
+        token = ClaimsRefreshToken.for_user(self.student)
+        blacklist_filter.sync()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'blacklistedtoken' in query['sql']])
+
+    def test_logged_out_token_is_rejected(self):
+        token = ClaimsRefreshToken.for_user(self.student)
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/auth/logout/', {'refresh_token': str(token)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+        # Another process only learns about it from the database
+        blacklist_filter.reset()
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_purge_expired_tokens(self):
+        live = ClaimsRefreshToken.for_user(self.student)
+        expired = [ClaimsRefreshToken.for_user(self.student) for _ in range(5)]
+        for token in expired[:2]:
+            token.blacklist()
+        OutstandingToken.objects.filter(jti__in=[token['jti'] for token in expired]).update(
+            expires_at=timezone.now() - timedelta(days=1))
+
+        call_command('purge_expired_tokens', chunk_size=2, stdout=io.StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportTests(TestCase):
+    CSV = (
+        'email,password,first_name,last_name,roll_no,role\n'
+        'a@example.com,secret1,Ann,A,R001,\n'
+        'b@example.com,secret2,Ben,B,R002,faculty\n'
+        'a@example.com,secret3,Ann,Again,R003,\n'
+        'c@example.com,secret4,Cy,C,R002,\n'
+        'taken@example.com,secret5,Tak,En,R004,\n'
+        'not-an-email,secret6,X,Y,R005,\n'
+        'd@example.com,short,D,D,R006,\n'
+        'e@example.com,,Eve,E,R007,wizard\n'
+        'f@example.com,,Fay,F,,\n'
+    )
+
+    def setUp(self):
+        make_user('taken@example.com')
+
+    def run_import(self, data, name='users.csv', **options):
+        path = tempfile.mktemp(suffix=os.path.splitext(name)[1])
+        with open(path, 'w') as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_users', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_command_validates_and_dedupes(self):
+        stdout, stderr = self.run_import(self.CSV, chunk_size=3, workers=0)
+        self.assertIn('Created 3 users, skipped 6 of 9 rows', stdout)
+        self.assertEqual(
+            set(User.objects.exclude(email='taken@example.com').values_list('email', flat=True)),
+            {'a@example.com', 'b@example.com', 'f@example.com'})
+        for reason in ['Duplicate email', 'Duplicate roll number', 'already registered',
+                       'valid email', 'at least 6', 'Unknown role']:
+            self.assertIn(reason, stderr)
+
+        ann = User.objects.get(email='a@example.com')
+        self.assertEqual((ann.first_name, ann.roll_no, ann.role), ('Ann', 'R001', 'student'))
+        self.assertTrue(ann.check_password('secret1'))
+        self.assertFalse(User.objects.get(email='f@example.com').has_usable_password())
+
+    def test_command_hashes_in_process_pool(self):
+        rows = ''.join(
+            json.dumps({'email': f'pool{i}@example.com', 'password': f'password{i}'}) + '\n' for i in range(6))
+        stdout, _ = self.run_import(rows, name='users.ndjson', workers=2)
+        self.assertIn('Created 6 users', stdout)
+        self.assertTrue(User.objects.get(email='pool5@example.com').check_password('password5'))
+
+    def test_users_registered_during_import_are_skipped(self):
+        bulk_create = type(User.objects).bulk_create
+
+        def register_first(manager, users, **kwargs):
+            # Someone registers one of the emails between the lookup and the insert
+            make_user('late@example.com', first_name='Late')
+            return bulk_create(manager, users, **kwargs)
+
+        rows = [(1, {'email': 'late@example.com'}), (2, {'email': 'early@example.com'})]
+        with mock.patch.object(type(User.objects), 'bulk_create', autospec=True, side_effect=register_first):
+            summary = provisioning.provision_users(rows, workers=0)
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(summary['skipped'], [{'line': 1, 'email': 'late@example.com', 'reason': 'Registered during import'}])
+        self.assertEqual(User.objects.get(email='late@example.com').first_name, 'Late')
+
+    @override_settings(USER_IMPORT_WORKERS=2)
+    def test_imports_share_one_pool(self):
+        def stop_pool():
+            provisioning._executor.shutdown()
+            provisioning._executor = None
+        self.addCleanup(stop_pool)
+
+        for batch in range(2):
+            rows = [(i, {'email': f'shared{batch}-{i}@example.com', 'password': 'password'}) for i in range(3)]
+            self.assertEqual(provisioning.provision_users(rows)['created'], 3)
+            if batch == 0:
+                pool = provisioning._executor
+        # Still running after both imports, not one pool per import
+        self.assertIs(provisioning._executor, pool)
+        self.assertEqual(pool.submit(len, 'abc').result(), 3)
+
+
+@override_settings(USER_IMPORT_WORKERS=0, USER_IMPORT_CHUNK_SIZE=4)
+class UserImportViewTests(TransactionTestCase):
+    # The import runs in a thread with its own connection, it has to see
+    # committed rows
+    def setUp(self):
+        make_user('taken@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin@example.com', role='admin'))
+
+    def post(self, data, name='users.csv'):
+        return self.client.post('/api/users/import/', {'file': SimpleUploadedFile(name, data)})
+
+    def wait_for_imports(self):
+        for thread in threading.enumerate():
+            if thread.name == 'user-import':
+                thread.join(timeout=30)
+
+    def test_admin_endpoint_streams_progress(self):
+        response = self.post(UserImportTests.CSV.encode())
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line['processed'] for line in lines], [4, 8, 9, 9])
+        self.assertTrue(lines[-1]['done'])
+        self.assertEqual((lines[-1]['created'], len(lines[-1]['skipped'])), (3, 6))
+
+        self.assertEqual(self.post(b'', name='users.txt').status_code, 400)
+        self.client.force_authenticate(make_user('student@example.com'))
+        self.assertEqual(self.post(UserImportTests.CSV.encode()).status_code, 403)
+
+    def test_import_finishes_when_the_client_goes_away(self):
+        rows = ''.join(f'email{i}@example.com\n' for i in range(10))
+        response = self.post(f'email\n{rows}'.encode())
+        next(iter(response.streaming_content))
+        response.close()
+        self.wait_for_imports()
+        self.assertEqual(User.objects.filter(email__startswith='email').count(), 10)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # TestCase would wrap every test in a transaction, which pins reads to the primary
+    router = PrimaryReplicaRouter()
+
+    def read_alias(self):
+        return self.router.db_for_read(Event)
+
+    def test_without_replicas_everything_reads_from_primary(self):
+        with routing_state():
+            self.assertEqual(replica_reads(self.read_alias)(), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_reads_go_to_replicas_only_where_allowed(self):
+        with routing_state():
+            self.assertEqual(self.read_alias(), 'default')
+            self.assertIn(replica_reads(self.read_alias)(), ['replica1', 'replica2'])
+
+            @replica_reads
+            def computes_then_writes():
+                with primary_reads():
+                    self.assertEqual(self.read_alias(), 'default')
+                with transaction.atomic():
+                    self.assertEqual(self.read_alias(), 'default')
+                self.assertNotEqual(self.read_alias(), 'default')
+                self.router.db_for_write(Event)
+                # Read-after-write stays on the primary
+                return self.read_alias()
+            self.assertEqual(computes_then_writes(), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_middleware_pins_unsafe_requests_and_recent_writers(self):
+        factory = RequestFactory()
+        seen = []
+
+        @replica_reads
+        def view(request):
+            seen.append(self.read_alias())
+            if request.method == 'POST':
+                self.router.db_for_write(Event)
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        self.assertNotIn(STICKY_COOKIE, middleware(factory.get('/')).cookies)
+        response = middleware(factory.post('/'))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        pinned_request = factory.get('/')
+        pinned_request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        middleware(pinned_request)
+        expired_request = factory.get('/')
+        expired_request.COOKIES[STICKY_COOKIE] = str(time.time() - 1)
+        middleware(expired_request)
+        self.assertEqual(seen, ['replica1', 'default', 'default', 'replica1'])
+
+
+class StudentPerformanceViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_report(self, student):
+        self.client.force_authenticate(student)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/student/performance/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_report_contents(self):
+        student = make_user('s1@example.com', first_name='Asha', last_name='R')
+        enrol_with_records(student, num_courses=2, num_assessments=2)
+        ungraded = make_course('NG')
+        StudentCourse.objects.create(student=student, course=ungraded, semester='odd', year=2025)
+
+        data, _ = self.get_report(student)
+
+        self.assertEqual(data['student']['name'], 'Asha R')
+        self.assertEqual(data['cgpa'], 9.0)
+        self.assertEqual(data['total_credits'], 8)
+        self.assertEqual(len(data['courses']), 3)
+        course = data['courses'][0]
+        self.assertEqual(course['grade'], 'A')
+        self.assertAlmostEqual(course['attendance_percentage'], 2 / 3 * 100)
+        self.assertEqual(len(course['assessments']), 2)
+        self.assertEqual(course['assessments'][0]['percentage'], 75.0)
+        self.assertEqual(data['courses'][2]['grade'], 'N/A')
+        self.assertEqual(data['courses'][2]['assessments'], [])
+
+    def test_non_student_forbidden(self):
+        faculty = make_user('f1@example.com', role='faculty')
+        self.client.force_authenticate(faculty)
+        response = self.client.get('/api/student/performance/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_served_from_rollup(self):
+        student = make_user('s2@example.com')
+        enrol_with_records(student, num_courses=3, num_assessments=5)
+        self.get_report(student)
+
+        _, num_queries = self.get_report(student)
+        self.assertEqual(num_queries, 1)
+
+
+class StudentPerformanceRollupTests(TempGalleryDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_user('rollup@example.com')
+        self.course = make_course('R1', credits=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentCourse.objects.create(
+                student=self.student, course=self.course, semester='odd', year=2025)
+
+    def rollup(self):
+        return StudentPerformanceRollup.objects.get(student=self.student)
+
+    def test_grade_report_changes_update_rollup(self):
+        self.assertEqual(self.rollup().total_credits, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = GradeReport.objects.create(
+                student=self.student, course=self.course, semester='odd', year=2025,
+                grade='B', gpa=3.0)
+        rollup = self.rollup()
+        self.assertEqual(rollup.total_credits, 3)
+        self.assertEqual(rollup.weighted_points, 21)
+        self.assertEqual(rollup.cgpa, 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertEqual(self.rollup().total_credits, 0)
+
+    def test_attendance_and_enrolment_changes_update_rollup(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(
+                student=self.student, course=self.course, date=date(2025, 1, 1), status='present')
+            Attendance.objects.create(
+                student=self.student, course=self.course, date=date(2025, 1, 2), status='absent')
+        self.assertEqual(self.rollup().courses[0]['attendance_percentage'], 50)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentCourse.objects.filter(student=self.student).update(status='dropped')
+            StudentCourse.objects.get(student=self.student).save()
+        self.assertEqual(self.rollup().courses, [])
+
+    def test_rebuild_command(self):
+        other = make_user('rollup2@example.com')
+        enrol_with_records(other, num_courses=2, num_assessments=1)
+        StudentPerformanceRollup.objects.all().delete()
+
+        call_command('rebuild_performance_rollups', chunk_size=1, stdout=io.StringIO())
+
+        self.assertEqual(StudentPerformanceRollup.objects.count(), 2)
+        rollup = StudentPerformanceRollup.objects.get(student=other)
+        self.assertEqual(rollup.total_credits, 8)
+        self.assertEqual(len(rollup.courses), 2)
+
+
+@tag('benchmark')
+class StudentPerformanceQueryBenchmark(TestCase):
+    '''
+    Query count of the performance report (first request, which builds the
+    rollup) must not grow with the number of courses and assessments
+    '''
+    def test_query_count_is_flat(self):
+        client = APIClient()
+        results = []
+        for num_courses, num_assessments in [(1, 1), (4, 10), (8, 40)]:
+            student = make_user(f'bench{num_courses}@example.com')
+            enrol_with_records(student, num_courses, num_assessments)
+            client.force_authenticate(student)
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/api/student/performance/')
+            elapsed = time.perf_counter() - started
+            self.assertEqual(len(response.json()['courses']), num_courses)
+            results.append(len(queries))
+            print(f'\n[performance] {num_courses} courses x {num_assessments} assessments: '
+                  f'{len(queries)} queries, {elapsed * 1000:.1f} ms')
+        self.assertEqual(len(set(results)), 1, results)
+
+
+def random_face(seed, size=(64, 64)):
+    pixels = np.random.default_rng(seed).integers(0, 255, size=size, dtype=np.uint8)
+    return Image.fromarray(pixels, mode='L')
+
+
+def image_upload(image, name='face.png', format='PNG'):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{format.lower()}')
+
+
+def random_gallery(size, dim=128, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return RosterGallery(np.arange(1, size + 1), vectors), vectors
+
+
+class RosterGalleryTests(TestCase):
+    def test_match_finds_closest_encoding(self):
+        gallery, vectors = random_gallery(50)
+        probe = vectors[17] + 0.01
+        user_id, distance = gallery.match(probe, threshold=0.6)
+        self.assertEqual(user_id, 18)
+        self.assertAlmostEqual(distance, float(np.linalg.norm(vectors[17] - probe)), places=4)
+
+    def test_match_rejects_far_probe(self):
+        gallery, vectors = random_gallery(50)
+        user_id, _ = gallery.match(-vectors[3], threshold=0.6)
+        self.assertIsNone(user_id)
+
+    def test_match_many_agrees_with_match(self):
+        gallery, vectors = random_gallery(30)
+        probes = vectors[[4, 9, 22]] + 0.02
+        results = gallery.match_many(probes, threshold=0.6)
+        self.assertEqual([user_id for user_id, _ in results], [5, 10, 23])
+
+    def test_empty_gallery(self):
+        gallery = RosterGallery([], np.empty((0, 8), dtype=np.float32))
+        self.assertEqual(gallery.match(np.zeros(8)), (None, float('inf')))
+
+
+@override_settings(FACE_PIPELINE_WORKERS=0)
+class FacialRecognitionAttendanceViewTests(TempGalleryDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.faculty = make_user('face-faculty@example.com', role='faculty')
+        self.course = make_course('FR1', faculty=self.faculty)
+        self.students = []
+        for i in range(5):
+            student = make_user(f'face{i}@example.com')
+            StudentCourse.objects.create(student=student, course=self.course, semester='odd', year=2025)
+            FacialRecognitionData.objects.create(
+                user=student, face_encoding=encode_encoding(image_to_encoding(random_face(i))))
+            self.students.append(student)
+        now = timezone.now()
+        self.session = AttendanceSession.objects.create(
+            course=self.course, faculty=self.faculty, start_time=now, end_time=now,
+            verification_method='facial_recognition', status='ongoing')
+
+    def mark(self, student, image):
+        self.client.force_authenticate(student)
+        return self.client.post(
+            f'/api/attendance-sessions/{self.session.id}/facial/',
+            {'face_image': image_upload(image)}, format='multipart')
+
+    def test_matching_face_marks_attendance(self):
+        response = self.mark(self.students[2], random_face(2))
+        self.assertEqual(response.status_code, 200)
+        attendance = Attendance.objects.get(student=self.students[2], course=self.course)
+        self.assertEqual(attendance.status, 'present')
+        self.assertEqual(AttendanceLog.objects.get().method, 'facial_recognition')
+
+    def test_someone_elses_face_is_rejected(self):
+        response = self.mark(self.students[2], random_face(3))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(AttendanceLog.objects.get().status, 'absent')
+
+    def test_student_without_face_data(self):
+        FacialRecognitionData.objects.filter(user=self.students[0]).update(status='inactive')
+        response = self.mark(self.students[0], random_face(0))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('not enrolled', response.json()['error'])
+
+
+class FacePipelineTests(TestCase):
+    def encode_bytes(self, image, format='PNG', **params):
+        buffer = io.BytesIO()
+        image.save(buffer, format=format, **params)
+        return buffer.getvalue()
+
+    @override_settings(FACE_PIPELINE_WORKERS=0)
+    def test_exif_orientation_is_applied(self):
+        image = random_face(7, size=(48, 32))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # stored rotated, display needs a 90 degree turn
+        rotated_back = image.transpose(Image.Transpose.ROTATE_90)
+        pipeline = FacePipeline()
+
+        vector, timings = pipeline.process(self.encode_bytes(rotated_back, exif=exif))
+
+        np.testing.assert_allclose(vector, image_to_encoding(image), atol=1e-6)
+        self.assertEqual(set(timings), {'queue', 'decode', 'orient', 'normalize'})
+
+    @override_settings(FACE_PIPELINE_WORKERS=0, FACE_PIPELINE_DECODE_SIZE=256)
+    def test_large_jpeg_is_draft_decoded(self):
+        data = self.encode_bytes(random_face(1, size=(2400, 3200)).convert('RGB'), format='JPEG')
+        vector, _ = FacePipeline().process(data)
+        self.assertEqual(vector.shape, (encoding_dim(),))
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=4)
+
+    @override_settings(FACE_PIPELINE_WORKERS=0, FACE_UPLOAD_MAX_BYTES=100)
+    def test_rejects_oversized_and_corrupt_uploads(self):
+        pipeline = FacePipeline()
+        with self.assertRaises(InvalidImage):
+            pipeline.process(self.encode_bytes(random_face(1)))
+        with self.assertRaises(InvalidImage):
+            pipeline.process(b'definitely not an image')
+
+    @override_settings(FACE_PIPELINE_WORKERS=1)
+    def test_process_pool_matches_inline(self):
+        pipeline = FacePipeline()
+        self.addCleanup(pipeline.shutdown)
+        data = self.encode_bytes(random_face(3))
+
+        vector, _ = pipeline.process(data)
+
+        np.testing.assert_allclose(vector, image_to_encoding(random_face(3)), atol=1e-6)
+        stats = pipeline.stats()
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['stages']['decode']['count'], 1)
+
+    @override_settings(FACE_PIPELINE_WORKERS=0, FACE_PIPELINE_QUEUE_SIZE=1, FACE_PIPELINE_QUEUE_TIMEOUT=0)
+    def test_full_queue_is_rejected(self):
+        pipeline = FacePipeline()
+        pipeline._get_executor()
+        pipeline._slots.acquire()
+        with self.assertRaises(PipelineBusy):
+            pipeline.process(self.encode_bytes(random_face(1)))
+        self.assertEqual(pipeline.stats()['rejected'], 1)
+
+    @override_settings(FACE_PIPELINE_WORKERS=1)
+    def test_broken_pool_is_replaced(self):
+        pipeline = FacePipeline()
+        self.addCleanup(pipeline.shutdown)
+        broken = pipeline._get_executor()
+        data = self.encode_bytes(random_face(3))
+        with mock.patch.object(broken, 'submit', side_effect=BrokenProcessPool):
+            with self.assertRaises(PipelineBusy), self.assertLogs('app.face_pipeline', 'ERROR'):
+                pipeline.process(data)
+        self.assertEqual(pipeline.stats()['queue_depth'], 0)
+
+        vector, _ = pipeline.process(data)
+        self.assertIsNot(pipeline._executor, broken)
+        np.testing.assert_allclose(vector, image_to_encoding(random_face(3)), atol=1e-6)
+
+    def test_metrics_view_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(make_user('metrics-student@example.com'))
+        self.assertEqual(client.get('/api/metrics/').status_code, 403)
+        client.force_authenticate(make_user('metrics-admin@example.com', role='admin'))
+        response = client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queue_depth', response.json()['face_pipeline'])
+
+
+class ResourceAvailabilityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user('booker@example.com')
+        self.client.force_authenticate(self.user)
+        self.room = Resource.objects.create(name='Seminar Hall', type='room')
+        self.lab = Resource.objects.create(name='Lab 1', type='lab')
+
+    def book(self, resource, start, end, status='approved'):
+        return ResourceBooking.objects.create(
+            resource=resource, user=self.user, status=status,
+            start_time=timezone.make_aware(datetime.strptime(start, '%Y-%m-%d %H:%M')),
+            end_time=timezone.make_aware(datetime.strptime(end, '%Y-%m-%d %H:%M')))
+
+    def busy_slots(self, time_slots):
+        return [slot['start_time'] for slot in time_slots if not slot['is_available']]
+
+    def test_single_day_hourly(self):
+        self.book(self.room, '2025-05-05 10:00', '2025-05-05 11:30')
+        self.book(self.room, '2025-05-05 14:00', '2025-05-05 15:00', status='rejected')
+
+        response = self.client.get(f'/api/resources/{self.room.id}/availability/', {'date': '2025-05-05'})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['date'], '2025-05-05')
+        self.assertEqual(len(data['time_slots']), 9)
+        self.assertEqual(self.busy_slots(data['time_slots']), ['10:00', '11:00'])
+
+    def test_pending_bookings_are_busy(self):
+        # New bookings start out pending and already block their slot in
+        # create_booking, so availability must not advertise it
+        response = self.client.post(f'/api/resources/{self.room.id}/bookings/', {
+            'start_time': '2025-05-05 14:00', 'end_time': '2025-05-05 15:00', 'purpose': 'Talk'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ResourceBooking.objects.get().status, 'pending')
+
+        response = self.client.get(f'/api/resources/{self.room.id}/availability/', {'date': '2025-05-05'})
+        self.assertEqual(self.busy_slots(response.json()['time_slots']), ['14:00'])
+
+    def test_quarter_hour_slots_over_a_range(self):
+        self.book(self.room, '2025-05-05 17:45', '2025-05-06 09:15')
+
+        response = self.client.get(f'/api/resources/{self.room.id}/availability/', {
+            'start_date': '2025-05-05', 'end_date': '2025-05-07', 'slot_minutes': 15})
+
+        days = response.json()['days']
+        self.assertEqual([day['date'] for day in days], ['2025-05-05', '2025-05-06', '2025-05-07'])
+        self.assertEqual(len(days[0]['time_slots']), 36)
+        self.assertEqual(self.busy_slots(days[0]['time_slots']), ['17:45'])
+        self.assertEqual(self.busy_slots(days[1]['time_slots']), ['09:00'])
+        self.assertEqual(self.busy_slots(days[2]['time_slots']), [])
+
+    def test_resource_under_maintenance_is_unavailable(self):
+        self.room.status = 'maintenance'
+        self.room.save()
+        response = self.client.get(f'/api/resources/{self.room.id}/availability/', {'date': '2025-05-05'})
+        self.assertFalse(any(slot['is_available'] for slot in response.json()['time_slots']))
+
+    def test_invalid_parameters(self):
+        url = f'/api/resources/{self.room.id}/availability/'
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date': '2025-05-05', 'slot_minutes': 7}).status_code, 400)
+        self.assertEqual(self.client.get(url, {
+            'start_date': '2025-05-01', 'end_date': '2025-06-15'}).status_code, 400)
+
+    def test_many_resources_in_fixed_queries(self):
+        self.book(self.room, '2025-05-05 09:00', '2025-05-05 10:00')
+        self.book(self.lab, '2025-05-20 12:00', '2025-05-20 13:00')
+        params = {
+            'resource_ids': f'{self.room.id},{self.lab.id},9999',
+            'start_date': '2025-05-01', 'end_date': '2025-05-31', 'slot_minutes': 30}
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/resources/availability/', params)
+
+        data = response.json()
+        self.assertEqual(data['not_found'], [9999])
+        room, lab = data['resources']
+        self.assertEqual(len(room['days']), 31)
+        self.assertEqual(self.busy_slots(room['days'][4]['time_slots']), ['09:00', '09:30'])
+        self.assertEqual(self.busy_slots(lab['days'][19]['time_slots']), ['12:00', '12:30'])
+
+
+def run_concurrently(num_threads, target):
+    '''
+    Runs target(i) on `num_threads` threads released at the same moment,
+    returns the results in thread order
+    '''
+    barrier = threading.Barrier(num_threads)
+    results = [None] * num_threads
+
+    def worker(i):
+        try:
+            barrier.wait()
+            results[i] = target(i)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class BookingCreateViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user('booking@example.com')
+        self.client.force_authenticate(self.user)
+        self.room = Resource.objects.create(name='Room 101', type='room')
+
+    def book(self, start, end):
+        return self.client.post(f'/api/resources/{self.room.id}/bookings/', {
+            'start_time': start, 'end_time': end, 'purpose': 'Club meeting'}, format='json')
+
+    def test_overlapping_pending_booking_is_rejected(self):
+        self.assertEqual(self.book('2025-05-05 10:00', '2025-05-05 11:00').status_code, 201)
+        self.assertEqual(self.book('2025-05-05 10:30', '2025-05-05 11:30').status_code, 400)
+        self.assertEqual(self.book('2025-05-05 11:00', '2025-05-05 12:00').status_code, 201)
+
+    def test_rejected_bookings_free_the_slot(self):
+        self.book('2025-05-05 10:00', '2025-05-05 11:00')
+        ResourceBooking.objects.update(status='rejected')
+        self.assertEqual(self.book('2025-05-05 10:00', '2025-05-05 11:00').status_code, 201)
+
+    def test_invalid_input(self):
+        self.assertEqual(self.book('tomorrow', '2025-05-05 11:00').status_code, 400)
+        self.assertEqual(self.book('2025-05-05 11:00', '2025-05-05 10:00').status_code, 400)
+        response = self.client.post('/api/resources/9999/bookings/', {
+            'start_time': '2025-05-05 10:00', 'end_time': '2025-05-05 11:00'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+@tag('benchmark')
+class BookingConcurrencyStressTest(TransactionTestCase):
+    '''
+    Many threads booking overlapping slots of the same resource at once,
+    exactly one of them may win
+    '''
+    def test_exactly_one_overlapping_booking_wins(self):
+        room = Resource.objects.create(name='Auditorium', type='hall')
+        users = [make_user(f'racer{i}@example.com') for i in range(16)]
+
+        def book(i):
+            client = APIClient()
+            client.force_authenticate(users[i])
+            # Every request overlaps every other one around 10:30
+            return client.post(f'/api/resources/{room.id}/bookings/', {
+                'start_time': f'2025-05-05 10:{i:02d}',
+                'end_time': f'2025-05-05 11:{i:02d}'}, format='json').status_code
+
+        started = time.perf_counter()
+        statuses = run_concurrently(len(users), book)
+        elapsed = time.perf_counter() - started
+        print(f'\n[bookings] {len(users)} concurrent overlapping requests in {elapsed * 1000:.0f} ms: '
+              f'{statuses.count(201)} created, {statuses.count(400)} conflicts')
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(400), len(users) - 1, statuses)
+        self.assertEqual(ResourceBooking.objects.filter(resource=room).count(), 1)
+
+
+def make_event(title='Hackathon', club=None, **fields):
+    if club is None:
+        club = Club.objects.create(name=f'{title} Club', creation_date=date(2024, 1, 1))
+    fields.setdefault('start_time', timezone.make_aware(datetime(2025, 5, 5, 10)))
+    fields.setdefault('end_time', fields['start_time'] + timedelta(hours=8))
+    return Event.objects.create(club=club, title=title, **fields)
+
+
+class EventRegistrationViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.event = make_event(max_participants=2)
+        self.students = [make_user(f'reg{i}@example.com') for i in range(3)]
+
+    def register(self, student, event=None):
+        self.client.force_authenticate(student)
+        return self.client.post(f'/api/events/{(event or self.event).id}/register/')
+
+    def test_capacity_is_enforced_by_counter(self):
+        self.assertEqual(self.register(self.students[0]).status_code, 201)
+        self.assertEqual(self.register(self.students[0]).status_code, 400)
+        self.assertEqual(self.register(self.students[1]).status_code, 201)
+        response = self.register(self.students[2])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('capacity', response.json()['error'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 2)
+
+    def test_unregistering_frees_a_seat(self):
+        self.register(self.students[0])
+        self.register(self.students[1])
+        EventRegistration.objects.get(user=self.students[0]).delete()
+        self.assertEqual(self.register(self.students[2]).status_code, 201)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 2)
+
+    def test_unlimited_event(self):
+        event = make_event('Open Mic')
+        for student in self.students:
+            self.assertEqual(self.register(student, event).status_code, 201)
+        event.refresh_from_db()
+        self.assertEqual(event.registered_count, 3)
+
+
+class ListPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('lister@example.com'))
+        club = Club.objects.create(name='Paging Club', creation_date=date(2024, 1, 1))
+        self.events = [make_event(f'Event {i}', club=club) for i in range(7)]
+
+    def test_cursor_walks_every_event_once(self):
+        seen = []
+        url = '/api/events/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json()), 3)
+            seen.extend(event['id'] for event in response.json())
+            cursor = response.get('X-Next-Cursor')
+            url = f'/api/events/?page_size=3&cursor={cursor}' if cursor else None
+        # Newest first
+        self.assertEqual(seen, [event.id for event in reversed(self.events)])
+
+    def test_next_link(self):
+        response = self.client.get('/api/events/?page_size=5&fields=id')
+        self.assertIn('rel="next"', response['Link'])
+        self.assertIn('fields=id', response['Link'])
+        self.assertNotIn('X-Next-Cursor', self.client.get('/api/events/?page_size=10'))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/events/?cursor=bogus').status_code, 400)
+        self.assertEqual(self.client.get('/api/events/?page_size=ten').status_code, 400)
+        self.assertEqual(self.client.get('/api/events/?fields=id,secret').status_code, 400)
+
+    def test_sparse_fieldset_narrows_output_and_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/events/?fields=id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()[0]), {'id', 'title'})
+        select = [query['sql'] for query in queries if 'app_event' in query['sql']][-1]
+        self.assertNotIn('description', select)
+
+    def test_clubs_and_memberships_are_paginated(self):
+        response = self.client.get('/api/clubs/?page_size=1&fields=name')
+        self.assertEqual(response.json(), [{'name': 'Paging Club'}])
+
+        club = Club.objects.get(name='Paging Club')
+        for i in range(3):
+            ClubMembership.objects.create(club=club, user=make_user(f'member{i}@example.com'))
+        response = self.client.get('/api/clubs/members/?club_name=Paging Club&page_size=2&fields=user')
+        self.assertEqual(len(response.json()), 2)
+        self.assertIn('X-Next-Cursor', response)
+
+
+class EventTimeWindowTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('window@example.com'))
+        club = Club.objects.create(name='Window Club', creation_date=date(2024, 1, 1))
+        self.events = {
+            day: make_event(f'May {day}', club=club, start_time=timezone.make_aware(datetime(2025, 5, day, 12)))
+            for day in (1, 5, 7, 12)
+        }
+
+    def titles(self, query):
+        response = self.client.get(f'/api/events/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {event['title'] for event in response.json()}
+
+    def test_date_window_includes_the_last_day(self):
+        self.assertEqual(self.titles('from=2025-05-05&to=2025-05-07'), {'May 5', 'May 7'})
+        self.assertEqual(self.titles('from=2025-05-06'), {'May 7', 'May 12'})
+        self.assertEqual(self.titles('to=2025-05-01'), {'May 1'})
+
+    def test_datetime_bounds(self):
+        self.assertEqual(self.titles('from=2025-05-05T12:00:00Z&to=2025-05-07T12:00:00Z'), {'May 5'})
+
+    def test_invalid_bound(self):
+        self.assertEqual(self.client.get('/api/events/?from=next-week').status_code, 400)
+
+    def test_window_uses_start_time_index(self):
+        with connection.cursor() as cursor:
+            sql, params = filter_event_window(
+                Event.objects.all(), {'from': '2025-05-05', 'to': '2025-05-11'}).query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('event_start_idx', plan)
+
+    def test_registration_deadline_is_compared_as_datetime(self):
+        event = make_event('Closed', registration_deadline=timezone.now() - timedelta(hours=1))
+        response = self.client.post(f'/api/events/{event.id}/register/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('deadline', response.json()['error'])
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache_stats.reset()
+        self.client = APIClient()
+        self.admin = make_user('cache-admin@example.com', role='admin')
+        self.client.force_authenticate(self.admin)
+        self.club = Club.objects.create(name='Cache Club', creation_date=date(2024, 1, 1))
+        self.event = make_event('Cached', club=self.club, max_participants=10)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_hit_skips_the_database(self):
+        first, _ = self.get('/api/events/?page_size=5')
+        second, num_queries = self.get('/api/events/?page_size=5')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('miss', 'hit'))
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(num_queries, 0)
+        # Different query string, different entry
+        self.assertEqual(self.get('/api/events/?page_size=5&fields=id')[0]['X-Cache'], 'miss')
+
+    @override_settings(SINGLE_PROCESS=False)
+    def test_off_on_a_process_local_cache_across_processes(self):
+        first, _ = self.get('/api/events/')
+        second, num_queries = self.get('/api/events/')
+        self.assertNotIn('X-Cache', second)
+        self.assertGreater(num_queries, 0)
+        self.assertEqual(second.json(), first.json())
+
+    def test_writes_bump_the_version(self):
+        self.get('/api/events/')
+        make_event('Fresh', club=self.club)
+        response, _ = self.get('/api/events/')
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual({event['title'] for event in response.json()}, {'Cached', 'Fresh'})
+
+        self.client.post(f'/api/events/{self.event.id}/register/')
+        response, _ = self.get('/api/events/')
+        self.assertEqual(response['X-Cache'], 'miss')
+        cached = next(event for event in response.json() if event['title'] == 'Cached')
+        self.assertEqual(cached['registered_count'], 1)
+
+    def test_membership_listing(self):
+        url = '/api/clubs/members/?club_name=Cache Club'
+        self.assertEqual(self.get(url)[0].json(), [])
+        self.assertEqual(self.get(url)[0]['X-Cache'], 'hit')
+        ClubMembership.objects.create(club=self.club, user=make_user('joiner@example.com'))
+        self.assertEqual(len(self.get(url)[0].json()), 1)
+
+    def test_counters_in_metrics(self):
+        self.get('/api/clubs/')
+        self.get('/api/clubs/')
+        self.get('/api/clubs/')
+        metrics = self.client.get('/api/metrics/').json()['response_cache']
+        self.assertEqual(metrics['ClubListCreateView'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user('etag@example.com')
+        self.client.force_authenticate(self.user)
+        self.club = Club.objects.create(name='ETag Club', creation_date=date(2024, 1, 1))
+        self.events = [make_event(f'Event {i}', club=self.club) for i in range(3)]
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, [query['sql'] for query in queries]
+
+    def test_list_not_modified_before_serialization(self):
+        response, _ = self.get('/api/events/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        # Straight from the response cache
+        response, queries = self.get('/api/events/', if_none_match=etag)
+        self.assertEqual((response.status_code, response['X-Cache'], queries), (304, 'hit', []))
+
+        # Only the aggregate when the cache is cold
+        cache.clear()
+        response, queries = self.get('/api/events/', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('MAX', queries[0])
+
+    def test_list_etag_changes_on_edit_and_delete(self):
+        etag = self.get('/api/events/')[0]['ETag']
+        self.events[0].title = 'Renamed'
+        self.events[0].save()
+        response, _ = self.get('/api/events/', if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.events[1].delete()
+        self.assertNotEqual(self.get('/api/events/')[0]['ETag'], etag)
+        # Representation differs per query string
+        self.assertNotEqual(self.get('/api/events/?fields=id')[0]['ETag'], etag)
+
+    def test_detail_validators(self):
+        url = f'/api/events/{self.events[0].id}/'
+        response, _ = self.get(url)
+        self.assertEqual(self.get(url, if_none_match=response['ETag'])[0].status_code, 304)
+        self.assertEqual(self.get(url, if_modified_since=response['Last-Modified'])[0].status_code, 304)
+
+        Event.objects.filter(pk=self.events[0].pk).update(updated_at=timezone.now() + timedelta(seconds=5))
+        self.assertEqual(self.get(url, if_none_match=response['ETag'])[0].status_code, 200)
+        self.assertEqual(self.get(url, if_modified_since=response['Last-Modified'])[0].status_code, 200)
+
+    def test_user_detail(self):
+        url = f'/api/auth/users/{self.user.id}'
+        etag = self.get(url)[0]['ETag']
+        self.assertEqual(self.get(url, if_none_match=etag)[0].status_code, 304)
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.assertEqual(self.get(url, if_none_match=etag)[0].status_code, 200)
+
+
+class ResolverTests(TestCase):
+    def setUp(self):
+        resolver_cache.clear()
+        cache.clear()
+        self.clubs = [Club.objects.create(name=f'Club {i}', creation_date=date(2024, 1, 1)) for i in range(3)]
+        self.users = [make_user(f'roll{i}@example.com', roll_no=f'R{i:03}') for i in range(3)]
+
+    def test_batch_resolution_is_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            resolved = resolve_many(CLUB_NAME, ['Club 0', 'Club 2', 'Nope'])
+        self.assertEqual(resolved, {'Club 0': self.clubs[0].pk, 'Club 2': self.clubs[2].pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_club_id('Club 2'), self.clubs[2].pk)
+        with self.assertRaises(Club.DoesNotExist):
+            resolve_club_id('Nope')
+
+    def test_renames_and_ambiguous_roll_numbers(self):
+        self.assertEqual(resolve_club_id('Club 1'), self.clubs[1].pk)
+        self.clubs[1].name = 'Club One'
+        self.clubs[1].save()
+        with self.assertRaises(Club.DoesNotExist):
+            resolve_club_id('Club 1')
+
+        self.assertEqual(resolve_user_id('R000'), self.users[0].pk)
+        make_user('twin@example.com', roll_no='R000')
+        with self.assertRaises(User.DoesNotExist):
+            resolve_user_id('R000')
+        self.assertEqual(resolve_user_id('R001'), self.users[1].pk)
+
+    def test_roll_no_lookup_uses_index(self):
+        with connection.cursor() as cursor:
+            sql, params = User.objects.filter(roll_no__in=['R001']).values_list('roll_no', 'pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('roll_no', plan)
+        self.assertIn('INDEX', plan)
+
+    def test_membership_endpoints_address_members_by_roll_number(self):
+        client = APIClient()
+        client.force_authenticate(make_user('coordinator@example.com', role='faculty'))
+        payload = {'club': 'Club 0', 'user': 'R001', 'role': 'member', 'join_date': '2025-01-01'}
+        self.assertEqual(client.post('/api/clubs/members/', payload, format='json').status_code, 201)
+        membership = ClubMembership.objects.get(club=self.clubs[0], user=self.users[1])
+
+        payload = {'club': 'Club 0', 'user': 'R001', 'role': 'coordinator'}
+        self.assertEqual(client.put('/api/clubs/members/', payload, format='json').status_code, 201)
+        membership.refresh_from_db()
+        self.assertEqual(membership.role, 'coordinator')
+        response = client.get('/api/clubs/members/?member_roll_no=R001')
+        self.assertEqual(response.json(), {'club_names': ['Club 0']})
+
+        payload = {'club': 'Club 0', 'user': 'R999'}
+        self.assertEqual(client.delete('/api/clubs/members/', payload, format='json').status_code, 404)
+        payload = {'club': 'Club 0', 'user': 'R001'}
+        response = client.delete('/api/clubs/members/', payload, format='json')
+        self.assertEqual(response.json(), {'message': 'User removed successfully'})
+        self.assertFalse(ClubMembership.objects.exists())
+
+
+class BulkMembershipTests(TestCase):
+    def setUp(self):
+        resolver_cache.clear()
+        cache.clear()
+        self.club = Club.objects.create(name='Robotics', creation_date=date(2024, 1, 1))
+        self.users = [make_user(f'bulk{i}@example.com', roll_no=f'B{i:03}') for i in range(200)]
+        self.roll_nos = [user.roll_no for user in self.users]
+        self.client = APIClient()
+        coordinator = make_user('coordinator@example.com')
+        ClubMembership.objects.create(club=self.club, user=coordinator, role='coordinator')
+        self.client.force_authenticate(coordinator)
+
+    def test_add_reports_outcome_per_roll_number(self):
+        ClubMembership.objects.create(club=self.club, user=self.users[0])
+        payload = {'club': 'Robotics', 'user': self.roll_nos[:3] + ['B001', 'NOPE'], 'role': 'member'}
+        response = self.client.post('/api/clubs/members/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['results'], {
+            'B000': 'already_member', 'B001': 'added', 'B002': 'added', 'NOPE': 'not_found'})
+        self.assertEqual(response.json()['counts'], {'already_member': 1, 'added': 2, 'not_found': 1})
+        self.assertEqual(ClubMembership.objects.filter(club=self.club, user__in=self.users).count(), 3)
+
+        response = self.client.post('/api/clubs/members/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['counts'], {'already_member': 3, 'not_found': 1})
+
+    def test_concurrently_added_members_are_already_members(self):
+        ClubMembership.objects.create(club=self.club, user=self.users[1])
+        manager_filter = type(ClubMembership.objects).filter
+        calls = []
+
+        def miss_first(manager, *args, **kwargs):
+            queryset = manager_filter(manager, *args, **kwargs)
+            if manager.model is not ClubMembership:
+                return queryset
+            calls.append(kwargs)
+            # The member check runs before B001 is added concurrently
+            return queryset.exclude(user=self.users[1]) if len(calls) == 1 else queryset
+
+        with mock.patch.object(type(ClubMembership.objects), 'filter', autospec=True, side_effect=miss_first):
+            report = add_members(self.club.pk, self.roll_nos[:3])
+        self.assertEqual(report['results'], {'B000': 'added', 'B001': 'already_member', 'B002': 'added'})
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(ClubMembership.objects.filter(club=self.club, user__in=self.users).count(), 3)
+
+    def test_whole_club_in_constant_queries(self):
+        # Club name, coordinated clubs, roll numbers, existing members, insert
+        # (+ savepoints), the insert is split in batches of SQLite's 999
+        # parameter limit
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos}, format='json')
+        self.assertEqual(response.json()['counts'], {'added': 200})
+        self.assertLessEqual(len(queries), 10)
+
+        # Club name and roll numbers are cached now, the unknown one is
+        # looked up again: members to remove, the rows the delete collects for
+        # post_delete, then a DELETE per 100 of them (+ savepoint)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                '/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos[:150] + ['NOPE']}, format='json')
+        self.assertEqual(response.json()['counts'], {'removed': 150, 'not_found': 1})
+        self.assertLessEqual(len(queries), 7)
+        self.assertEqual(ClubMembership.objects.filter(club=self.club, user__in=self.users).count(), 50)
+
+        response = self.client.delete(
+            '/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos[:2]}, format='json')
+        self.assertEqual(response.json()['results'], {'B000': 'not_member', 'B001': 'not_member'})
+
+    def test_bulk_add_invalidates_cached_listings(self):
+        self.client.get('/api/clubs/members/?club_name=Robotics')
+        self.client.post('/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos[:5]}, format='json')
+        response = self.client.get('/api/clubs/members/?club_name=Robotics')
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(len(response.json()), 6)
+
+    def test_bulk_remove_drops_cached_listings_and_roles(self):
+        self.client.post(
+            '/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos[:3], 'role': 'coordinator'}, format='json')
+        self.assertEqual(coordinated_club_ids(self.users[0].pk), [self.club.pk])
+        self.client.get('/api/clubs/members/?club_name=Robotics')
+
+        self.client.delete('/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos[:3]}, format='json')
+        self.assertEqual(coordinated_club_ids(self.users[0].pk), [])
+        response = self.client.get('/api/clubs/members/?club_name=Robotics')
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(len(response.json()), 1)
+
+    def test_rejects_bad_requests(self):
+        for payload, code in [
+            ({'club': 'Robotics', 'user': []}, 400),
+            ({'club': 'Robotics', 'user': [1, 2]}, 400),
+            ({'club': 'Robotics', 'user': ['B000'], 'role': 'owner'}, 400),
+            ({'club': 'Nope', 'user': ['B000']}, 404),
+        ]:
+            self.assertEqual(self.client.post('/api/clubs/members/', payload, format='json').status_code, code)
+        with self.settings(CLUB_MEMBERSHIP_BULK_MAX_SIZE=10):
+            response = self.client.post('/api/clubs/members/', {'club': 'Robotics', 'user': self.roll_nos}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ClubMembership.objects.filter(user__in=self.users).exists())
+
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post('/api/clubs/members/', {'club': 'Robotics', 'user': ['B001']}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ClubPermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        resolver_cache.clear()
+        self.chess = Club.objects.create(name='Chess', creation_date=date(2024, 1, 1))
+        self.drama = Club.objects.create(name='Drama', creation_date=date(2024, 1, 1))
+        self.coordinator = make_user('coordinator@example.com', roll_no='C001')
+        self.membership = ClubMembership.objects.create(club=self.chess, user=self.coordinator, role='coordinator')
+        self.student = make_user('student@example.com', roll_no='S001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.coordinator)
+        start = timezone.now()
+        self.event = {'title': 'Blitz', 'start_time': start.isoformat(), 'end_time': start.isoformat()}
+
+    @override_settings(SINGLE_PROCESS=False, REST_FRAMEWORK={'DEFAULT_AUTHENTICATION_CLASSES': ()})
+    def test_several_processes_need_a_shared_cache(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'CanManageClub'):
+            apps.get_app_config('app').ready()
+
+    def test_coordinators_manage_only_their_clubs(self):
+        payload = {'club': 'Chess', 'user': 'S001', 'role': 'member', 'join_date': '2025-01-01'}
+        self.assertEqual(self.client.post('/api/clubs/members/', payload, format='json').status_code, 201)
+        payload = {'club': 'Drama', 'user': 'S001', 'role': 'member', 'join_date': '2025-01-01'}
+        self.assertEqual(self.client.post('/api/clubs/members/', payload, format='json').status_code, 403)
+
+        response = self.client.post('/api/events/', {**self.event, 'club': self.chess.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        event_id = response.json()['event']['id']
+        response = self.client.post('/api/events/', {**self.event, 'club': self.drama.pk}, format='json')
+        self.assertEqual(response.status_code, 403)
+        # Moving an event to another club needs that club too
+        response = self.client.put(f'/api/events/{event_id}/', {**self.event, 'club': self.drama.pk}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        drama_event = Event.objects.create(club=self.drama, title='Play', start_time=timezone.now(), end_time=timezone.now())
+        self.assertEqual(self.client.delete(f'/api/events/{drama_event.pk}/').status_code, 403)
+        self.assertEqual(self.client.delete(f'/api/events/{event_id}/').status_code, 204)
+
+    def test_global_roles_and_plain_members(self):
+        self.client.force_authenticate(make_user('faculty@example.com', role='faculty'))
+        response = self.client.post('/api/events/', {**self.event, 'club': self.drama.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        ClubMembership.objects.create(club=self.drama, user=self.student)
+        self.client.force_authenticate(self.student)
+        response = self.client.post('/api/events/', {**self.event, 'club': self.drama.pk}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get('/api/events/').status_code, 200)
+
+    def test_roles_are_cached_and_evicted_on_membership_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(coordinated_club_ids(self.coordinator.pk), [self.chess.pk])
+        with self.assertNumQueries(0):
+            coordinated_club_ids(self.coordinator.pk)
+
+        self.membership.role = 'member'
+        self.membership.save()
+        response = self.client.post('/api/events/', {**self.event, 'club': self.chess.pk}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(make_user('faculty@example.com', role='faculty'))
+        # Bulk inserts skip post_save
+        payload = {'club': 'Drama', 'user': ['C001'], 'role': 'coordinator'}
+        self.assertEqual(self.client.post('/api/clubs/members/', payload, format='json').status_code, 201)
+        self.assertEqual(coordinated_club_ids(self.coordinator.pk), [self.drama.pk])
+
+
+def record_course_attendance(course, students, num_sessions, start=date(2025, 1, 1)):
+    '''
+    One attendance row per student and session, bulk inserted. Student i is
+    absent from every (i % 5 + 3)th session and late at every 10th.
+    '''
+    Attendance.objects.bulk_create(
+        Attendance(
+            student=student, course=course, date=start + timedelta(days=day),
+            status='absent' if day % (i % 5 + 3) == 0 else 'late' if day % 10 == 3 else 'present')
+        for i, student in enumerate(students) for day in range(num_sessions)
+    )
+
+
+class CourseAttendanceReportTests(TestCase):
+    def setUp(self):
+        self.course = make_course('CS101')
+        self.students = [make_user(f'att{i}@example.com', roll_no=f'A{i:03}') for i in range(5)]
+        record_course_attendance(self.course, self.students, 10)
+        Attendance.objects.create(student=self.students[0], course=make_course('CS102'), date=date(2025, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('faculty@example.com', role='faculty'))
+        self.url = f'/api/courses/{self.course.pk}/attendance/'
+
+    def test_counts_and_percentage_per_student(self):
+        with self.assertNumQueries(1):
+            report = course_attendance_report(self.course.pk)
+        self.assertEqual([row['roll_no'] for row in report], ['A000', 'A001', 'A002', 'A003', 'A004'])
+        # Student 1: absent on days 0, 4 and 8, late on day 3
+        self.assertEqual(
+            {key: report[1][key] for key in ('present', 'late', 'absent', 'excused', 'total', 'percentage')},
+            {'present': 6, 'late': 1, 'absent': 3, 'excused': 0, 'total': 10, 'percentage': 60.0})
+        for row in report:
+            records = Attendance.objects.filter(student_id=row['student_id'], course=self.course)
+            self.assertEqual(row['total'], records.count())
+            self.assertEqual(row['present'], records.filter(status='present').count())
+
+    def test_date_range_and_threshold_are_filtered_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            report = course_attendance_report(self.course.pk, start=date(2025, 1, 2), end=date(2025, 1, 5))
+        self.assertEqual({row['total'] for row in report}, {4})
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}")
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('attendance_course_date_idx', plan)
+
+        with CaptureQueriesContext(connection) as queries:
+            report = course_attendance_report(self.course.pk, below=65)
+        self.assertIn('HAVING', queries[0]['sql'])
+        self.assertEqual([row['roll_no'] for row in report], ['A000', 'A001'])
+        full = course_attendance_report(self.course.pk)
+        self.assertEqual(report, [row for row in full if row['percentage'] < 65])
+
+    def test_endpoint(self):
+        response = self.client.get(f'{self.url}?from=2025-01-01&to=2025-01-10&below=65')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['course']['code'], 'CS101')
+        self.assertEqual(body['below'], 65.0)
+        self.assertEqual(len(body['students']), 2)
+
+        self.assertEqual(self.client.get(f'{self.url}?from=yesterday').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}?below=most').status_code, 400)
+        self.assertEqual(self.client.get('/api/courses/999999/attendance/').status_code, 404)
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+@tag('benchmark')
+class CourseAttendanceReportBenchmark(TestCase):
+    '''
+    Whole course report of 200 students x 60 sessions, one grouped query
+    against the per student loop it replaces
+    '''
+    def test_grouped_report_against_per_student_loop(self):
+        course = make_course('BENCH')
+        students = [make_user(f'bench{i}@example.com', roll_no=f'B{i:03}') for i in range(200)]
+        record_course_attendance(course, students, 60)
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            report = course_attendance_report(course.pk, below=70)
+        grouped_ms = (time.perf_counter() - started) * 1000
+        self.assertEqual(len(queries), 1)
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as loop_queries:
+            looped = []
+            for student in students:
+                records = Attendance.objects.filter(student=student, course=course)
+                total = records.count()
+                present = records.filter(status='present').count()
+                if present * 100 / total < 70:
+                    looped.append(student.pk)
+        loop_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual([row['student_id'] for row in report], looped)
+        print(f'\n[attendance report] 200 students x 60 sessions, below 70%: {len(report)} students; '
+              f'grouped {grouped_ms:.1f} ms / {len(queries)} query, '
+              f'per student loop {loop_ms:.1f} ms / {len(loop_queries)} queries')
+
+
+def read_export(response):
+    assert response.streaming
+    return b''.join(response.streaming_content)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.course = make_course('CS201')
+        self.other = make_course('CS202')
+        self.students = [make_user(f'exp{i}@example.com', roll_no=f'E{i:03}') for i in range(4)]
+        record_course_attendance(self.course, self.students, 5)
+        record_course_attendance(self.other, self.students[:1], 5)
+        for student in self.students:
+            GradeReport.objects.create(student=student, course=self.course, semester='odd', year=2025, grade='A', gpa=3.7)
+        GradeReport.objects.create(student=self.students[0], course=self.other, semester='even', year=2024, grade='B', gpa=3.0)
+        club = Club.objects.create(name='Quiz', creation_date=date(2024, 1, 1))
+        self.event = Event.objects.create(club=club, title='Finals', start_time=timezone.now(), end_time=timezone.now())
+        for student in self.students[:3]:
+            EventRegistration.objects.create(event=self.event, user=student)
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('registrar@example.com', role='admin'))
+
+    def test_attendance_csv_filtered_by_course(self):
+        response = self.client.get(f'/api/exports/attendance/?course={self.course.pk}&from=2025-01-02')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attendance.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(read_export(response).decode())))
+        self.assertEqual(rows[0], EXPORTS['attendance'].headers)
+        self.assertEqual(len(rows), 1 + 4 * 4)
+        self.assertEqual({row[4] for row in rows[1:]}, {'2025-01-02', '2025-01-03', '2025-01-04', '2025-01-05'})
+        self.assertEqual({row[3] for row in rows[1:]}, {'CS201'})
+
+    def test_grades_ndjson_filtered_by_semester_and_year(self):
+        response = self.client.get('/api/exports/grades/?output=ndjson&semester=odd&year=2025')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in read_export(response).decode().splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0], {
+            'id': lines[0]['id'], 'student_id': self.students[0].pk, 'roll_no': 'E000',
+            'course_code': 'CS201', 'semester': 'odd', 'year': 2025, 'grade': 'A', 'gpa': 3.7})
+
+    def test_gzipped_registrations(self):
+        response = self.client.get(f'/api/exports/registrations/?event={self.event.pk}&gzip=1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('registrations.csv.gz', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(read_export(response)).decode())))
+        self.assertEqual([row[4] for row in rows[1:]], ['E000', 'E001', 'E002'])
+
+    def test_rows_are_read_in_chunks(self):
+        queryset = EXPORTS['attendance'].queryset({})
+        with self.settings(EXPORT_CHUNK_SIZE=7):
+            chunks = list(stream_export(EXPORTS['attendance'], queryset, 'ndjson'))
+        # 25 rows in chunks of 7
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [7, 7, 7, 4])
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.get('/api/exports/payroll/').status_code, 404)
+        self.assertEqual(self.client.get('/api/exports/grades/?output=xlsx').status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/grades/?year=last').status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/attendance/?from=monday').status_code, 400)
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get('/api/exports/grades/').status_code, 403)
+
+
+@tag('benchmark')
+class ExportMemoryBenchmark(TestCase):
+    '''
+    Peak Python memory of streaming an attendance export must not grow with
+    the number of rows
+    '''
+    def stream_peak(self, course):
+        response = self.client.get(f'/api/exports/attendance/?course={course.pk}&output=ndjson')
+        tracemalloc.start()
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return size, peak
+
+    def test_peak_memory_is_flat(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('registrar@example.com', role='admin'))
+        students = [make_user(f'mem{i}@example.com', roll_no=f'M{i:03}') for i in range(200)]
+        small, large = make_course('SMALL'), make_course('LARGE')
+        record_course_attendance(small, students, 10)
+        record_course_attendance(large, students, 100)
+
+        small_size, small_peak = self.stream_peak(small)
+        large_size, large_peak = self.stream_peak(large)
+        print(f'\n[exports] 2,000 rows: {small_size / 1024:.0f} KiB streamed, peak {small_peak / 1024:.0f} KiB; '
+              f'20,000 rows: {large_size / 1024:.0f} KiB streamed, peak {large_peak / 1024:.0f} KiB')
+        self.assertGreater(large_size, 9 * small_size)
+        self.assertLess(large_peak, 2 * small_peak)
+
+
+class AttendanceLogArchiveTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        settings_override = override_settings(ATTENDANCE_LOG_ARCHIVE_DIR=archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.archive_dir = archive_dir
+
+        self.course = make_course('CS301')
+        self.other = make_course('CS302')
+        self.students = [make_user(f'log{i}@example.com') for i in range(3)]
+        self.now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        # 3 logs per student and course on each of 3 old days, plus one today
+        for days_ago in (200, 199, 198, 0):
+            for course in (self.course, self.other):
+                logs = AttendanceLog.objects.bulk_create(
+                    AttendanceLog(student=student, course=course) for student in self.students)
+                AttendanceLog.objects.filter(id__in=[log.id for log in logs]).update(
+                    timestamp=self.now - timedelta(days=days_ago))
+
+    def archived_ids(self):
+        return sorted(row['id'] for row in read_archived_logs())
+
+    def test_command_moves_old_logs_to_day_partitions(self):
+        old_ids = sorted(AttendanceLog.objects.filter(
+            timestamp__lt=self.now - timedelta(days=180)).values_list('id', flat=True))
+        out = io.StringIO()
+        call_command('archive_attendance_logs', chunk_size=5, stdout=out)
+        self.assertIn('Archived 18 attendance logs', out.getvalue())
+
+        self.assertEqual(AttendanceLog.objects.count(), 6)
+        self.assertEqual(self.archived_ids(), old_ids)
+        days = sorted(os.listdir(self.archive_dir))
+        self.assertEqual(days, [(self.now - timedelta(days=d)).date().isoformat() for d in (200, 199, 198)])
+        for day in days:
+            for name in os.listdir(os.path.join(self.archive_dir, day)):
+                self.assertTrue(name.endswith('.ndjson.gz'))
+                with gzip.open(os.path.join(self.archive_dir, day, name), 'rt') as archive:
+                    self.assertTrue(all(json.loads(line)['timestamp'].startswith(day) for line in archive))
+
+    def test_failed_delete_leaves_no_duplicates(self):
+        cutoff = self.now - timedelta(days=180)
+        with mock.patch('django.db.models.query.QuerySet.delete', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                archive_chunk(cutoff, 10)
+        self.assertEqual(AttendanceLog.objects.count(), 24)
+        self.assertEqual(len(self.archived_ids()), 10)
+
+        while archive_chunk(cutoff, 10):
+            pass
+        archived = self.archived_ids()
+        self.assertEqual(len(archived), 18)
+        self.assertEqual(len(set(archived)), 18)
+
+    def test_overlapping_parts_are_read_once(self):
+        cutoff = self.now - timedelta(days=180)
+        with mock.patch('django.db.models.query.QuerySet.delete', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                archive_chunk(cutoff, 10)
+        # Written to the archive but still in the table
+        ids = [log['id'] for log in course_logs(self.course.pk)]
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(len(set(ids)), 12)
+
+        # Rerun with another chunk size, the parts overlap
+        while archive_chunk(cutoff, 4):
+            pass
+        archived = self.archived_ids()
+        self.assertEqual(len(archived), 18)
+        self.assertEqual(len(set(archived)), 18)
+        self.assertEqual(len(list(course_logs(self.course.pk))), 12)
+
+    def test_archive_keeps_full_timestamp_precision(self):
+        log = AttendanceLog.objects.order_by('id').first()
+        timestamp = log.timestamp.replace(microsecond=123456)
+        AttendanceLog.objects.filter(id=log.id).update(timestamp=timestamp)
+        archive_chunk(self.now - timedelta(days=180), 1)
+        [row] = read_archived_logs()
+        self.assertEqual((row['id'], row['timestamp']), (log.id, timestamp))
+
+    def test_read_path_spans_archive_and_table(self):
+        call_command('archive_attendance_logs', days=180, stdout=io.StringIO())
+        logs = list(course_logs(self.course.pk))
+        self.assertEqual(len(logs), 12)
+        self.assertEqual({log['course_id'] for log in logs}, {self.course.pk})
+        self.assertEqual([log['timestamp'] for log in logs], sorted(log['timestamp'] for log in logs))
+
+        start = (self.now - timedelta(days=199)).date()
+        logs = list(course_logs(self.course.pk, start=start, end=start))
+        self.assertEqual(len(logs), 3)
+        self.assertEqual({log['timestamp'] for log in logs}, {self.now - timedelta(days=199)})
+        self.assertEqual(len(list(course_logs(self.course.pk, start=self.now.date()))), 3)
+
+        client = APIClient()
+        client.force_authenticate(make_user('faculty@example.com', role='faculty'))
+        response = client.get(f'/api/courses/{self.course.pk}/attendance-logs/?from={start}')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(client.get('/api/courses/999999/attendance-logs/').status_code, 404)
+
+    def test_hot_reads_use_course_timestamp_index(self):
+        queryset = AttendanceLog.objects.filter(
+            course_id=self.course.pk, timestamp__gte=self.now - timedelta(days=1)).order_by('timestamp')
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('attlog_course_timestamp_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotIn('ORDER BY', str(AttendanceLog.objects.all().query))
+
+
+class ExpandedListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Chess', creation_date=date(2024, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('viewer@example.com'))
+
+    def add_members(self, count):
+        start = ClubMembership.objects.count()
+        users = [make_user(f'member{i}@example.com', roll_no=f'M{i:04}', first_name=f'Member{i}')
+                 for i in range(start, start + count)]
+        ClubMembership.objects.bulk_create(ClubMembership(club=self.club, user=user) for user in users)
+
+    def list_queries(self, path):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_the_list(self):
+        path = '/api/clubs/members/?expand=user,club&page_size=500'
+        self.add_members(5)
+        small, small_queries = self.list_queries(path)
+        self.add_members(295)
+        large, large_queries = self.list_queries(path)
+
+        self.assertEqual(len(small.json()), 5)
+        self.assertEqual(len(large.json()), 300)
+        self.assertEqual(small_queries, large_queries)
+        # ETag aggregate and the page, joined with users and clubs
+        self.assertEqual(large_queries, 2)
+        member = large.json()[-1]
+        self.assertEqual(member['club'], {'id': self.club.pk, 'name': 'Chess', 'status': self.club.status})
+        self.assertEqual(set(member['user']), {'id', 'first_name', 'last_name', 'roll_no', 'email'})
+        self.assertEqual(member['user']['first_name'], 'Member0')
+
+    def test_expand_only_reads_embedded_columns(self):
+        self.add_members(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/clubs/members/?expand=user&fields=id,user')
+        page_sql = queries[-1]['sql']
+        self.assertIn('JOIN "app_user"', page_sql)
+        self.assertIn('"app_user"."roll_no"', page_sql)
+        self.assertNotIn('"app_user"."password"', page_sql)
+        self.assertNotIn('"app_clubmembership"."role"', page_sql)
+
+    def test_event_listing_expands_club(self):
+        start = timezone.now()
+        for i in range(3):
+            Event.objects.create(club=self.club, title=f'Round {i}', start_time=start, end_time=start)
+        response, queries = self.list_queries('/api/events/?expand=club')
+        self.assertEqual(queries, 2)
+        self.assertEqual({event['club']['name'] for event in response.json()}, {'Chess'})
+
+        self.assertEqual(self.client.get('/api/events/').json()[0]['club'], self.club.pk)
+        response = self.client.get('/api/events/?expand=created_by')
+        self.assertEqual(response.status_code, 400)
+
+    def test_embedded_edits_change_the_etag(self):
+        self.add_members(2)
+        response = self.client.get('/api/clubs/members/?expand=user')
+        etag = response['ETag']
+        user = User.objects.get(roll_no='M0000')
+        user.first_name = 'Renamed'
+        user.save()
+        response = self.client.get('/api/clubs/members/?expand=user', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', {member['user']['first_name'] for member in response.json()})
+
+
+@tag('benchmark')
+class SQLiteTuningBenchmark(TestCase):
+    def test_connection_pragmas(self):
+        if not settings.SQLITE_TUNED:
+            self.skipTest('SQLITE_TUNED is off')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0].lower(), 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+    def test_mixed_workload_across_processes(self):
+        report = run_benchmark(processes=4, seconds=1, write_ratio=0.2, rows=2000)
+        for mode, stats in report.items():
+            print(f"\n[sqlite] {mode}: {stats['reads_per_s']:,.0f} reads/s, {stats['writes_per_s']:,.0f} writes/s, "
+                  f"{stats['errors']} lock errors, write p99 {stats['write_p99_ms']:.2f} ms")
+        # Lock errors depend on the machine's load, compare the modes rather
+        # than expect none
+        self.assertLessEqual(report['tuned']['errors'], report['baseline']['errors'])
+
+
+@tag('benchmark')
+class EventRegistrationFlashCrowdTest(TransactionTestCase):
+    '''
+    A popular event opening: many students registering at the same moment,
+    reports throughput and checks nobody gets past max_participants
+    '''
+    def test_no_over_registration(self):
+        capacity = 25
+        event = make_event('Fest Finale', max_participants=capacity)
+        students = [make_user(f'crowd{i}@example.com') for i in range(80)]
+
+        def register(i):
+            client = APIClient()
+            client.force_authenticate(students[i])
+            return client.post(f'/api/events/{event.id}/register/').status_code
+
+        started = time.perf_counter()
+        statuses = run_concurrently(len(students), register)
+        elapsed = time.perf_counter() - started
+        print(f'\n[registrations] {len(students)} concurrent requests in {elapsed * 1000:.0f} ms '
+              f'({len(students) / elapsed:.0f} req/s): {statuses.count(201)} registered, '
+              f'{statuses.count(400)} turned away')
+
+        event.refresh_from_db()
+        self.assertEqual(statuses.count(201), capacity)
+        self.assertEqual(statuses.count(400), len(students) - capacity)
+        self.assertEqual(event.registered_count, capacity)
+        self.assertEqual(EventRegistration.objects.filter(event=event).count(), capacity)
+
+
+class FacialAttendanceBatchViewTests(TempGalleryDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.faculty = make_user('batch-faculty@example.com', role='faculty')
+        self.client.force_authenticate(self.faculty)
+        self.course = make_course('FB1', faculty=self.faculty)
+        self.students = []
+        for i in range(30):
+            student = make_user(f'batch{i}@example.com')
+            StudentCourse.objects.create(student=student, course=self.course, semester='odd', year=2025)
+            FacialRecognitionData.objects.create(
+                user=student, face_encoding=encode_encoding(image_to_encoding(random_face(i))))
+            self.students.append(student)
+        now = timezone.now()
+        self.session = AttendanceSession.objects.create(
+            course=self.course, faculty=self.faculty, start_time=now, end_time=now,
+            verification_method='facial_recognition', status='ongoing')
+
+    def mark(self, student, seed):
+        encoding = encode_encoding(image_to_encoding(random_face(seed)))
+        return {'student': student.id, 'face_encoding': base64.b64encode(encoding).decode()}
+
+    def post(self, marks):
+        return self.client.post(
+            f'/api/attendance-sessions/{self.session.id}/facial/batch/', {'marks': marks}, format='json')
+
+    def test_per_item_results(self):
+        outsider = make_user('outsider@example.com')
+        Attendance.objects.create(
+            student=self.students[4], course=self.course, date=timezone.localdate(), status='present')
+        marks = [
+            self.mark(self.students[0], 0),
+            self.mark(self.students[1], 2),
+            self.mark(self.students[0], 0),
+            self.mark(outsider, 0),
+            self.mark(self.students[4], 4),
+            {'student': self.students[5].id, 'face_encoding': 'not base64!'},
+            self.mark(self.students[3], 3),
+        ]
+
+        response = self.post(marks)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [result['status'] for result in data['results']],
+            ['present', 'no_match', 'duplicate', 'not_enrolled', 'already_marked', 'invalid', 'present'])
+        self.assertEqual(data['marked'], 2)
+        self.assertEqual(
+            set(Attendance.objects.filter(course=self.course).values_list('student_id', flat=True)),
+            {self.students[0].id, self.students[3].id, self.students[4].id})
+        self.assertEqual(AttendanceLog.objects.filter(status='present').count(), 2)
+        self.assertEqual(AttendanceLog.objects.filter(status='absent').count(), 1)
+
+    def test_concurrent_marks_are_reported_already_marked(self):
+        bulk_create = type(Attendance.objects).bulk_create
+
+        def mark_first(manager, objs, **kwargs):
+            if manager.model is Attendance:
+                # A single mark for the student lands between the check and the insert
+                Attendance.objects.create(
+                    student=self.students[0], course=self.course, date=timezone.localdate(), status='late')
+            return bulk_create(manager, objs, **kwargs)
+
+        with mock.patch.object(type(Attendance.objects), 'bulk_create', autospec=True, side_effect=mark_first):
+            response = self.post([self.mark(self.students[0], 0), self.mark(self.students[3], 3)])
+
+        data = response.json()
+        self.assertEqual([result['status'] for result in data['results']], ['already_marked', 'present'])
+        self.assertEqual(data['marked'], 1)
+        self.assertEqual(Attendance.objects.get(student=self.students[0]).status, 'late')
+        self.assertEqual(
+            list(AttendanceLog.objects.filter(status='present').values_list('student_id', flat=True)),
+            [self.students[3].id])
+
+    def test_query_count_independent_of_batch_size(self):
+        self.post([self.mark(self.students[0], 0)])
+        query_counts = []
+        for students in [self.students[1:3], self.students[3:30]]:
+            marks = [self.mark(student, self.students.index(student)) for student in students]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(marks)
+            self.assertEqual(response.json()['marked'], len(students))
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_students_cannot_submit_batches(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.post([self.mark(self.students[0], 0)])
+        self.assertEqual(response.status_code, 403)
+
+
+class FaceGalleryShardTests(TempGalleryDirMixin, TestCase):
+    def test_round_trip_float32_is_zero_copy(self):
+        _, vectors = random_gallery(20, dim=32)
+        path = write_shard(shard_path(1), np.arange(100, 120), vectors)
+
+        gallery = open_shard(path)
+
+        self.assertEqual(gallery.user_ids.tolist(), list(range(100, 120)))
+        np.testing.assert_array_equal(gallery.matrix, vectors)
+        self.assertFalse(gallery.matrix.flags.owndata)
+        self.assertFalse(gallery.matrix.flags.writeable)
+        self.assertEqual(gallery.match(vectors[5])[0], 105)
+
+    def test_round_trip_float16(self):
+        _, vectors = random_gallery(10, dim=32)
+        path = write_shard(shard_path(2), np.arange(10), vectors, dtype='float16')
+
+        gallery = open_shard(path)
+
+        self.assertEqual(gallery.matrix.dtype, np.float32)
+        np.testing.assert_allclose(gallery.matrix, vectors, atol=1e-3)
+        self.assertEqual(path.stat().st_size, 32 + 10 * 8 + 10 * 32 * 2)
+
+    def test_corrupt_shard_is_rejected(self):
+        _, vectors = random_gallery(4, dim=8)
+        path = write_shard(shard_path(3), np.arange(4), vectors)
+        with open(path, 'r+b') as f:
+            f.truncate(path.stat().st_size - 4)
+        with self.assertRaises(GalleryFormatError):
+            open_shard(path)
+
+    def test_shard_rebuilt_when_enrolment_or_face_status_changes(self):
+        faculty = make_user('shard-faculty@example.com', role='faculty')
+        course = make_course('SH1', faculty=faculty)
+        student = make_user('shard-student@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            enrolment = StudentCourse.objects.create(
+                student=student, course=course, semester='odd', year=2025)
+            face = FacialRecognitionData.objects.create(
+                user=student, face_encoding=encode_encoding(image_to_encoding(random_face(1))))
+        self.assertEqual(open_shard(shard_path(course.id)).user_ids.tolist(), [student.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            face.status = 'inactive'
+            face.save()
+        self.assertEqual(len(open_shard(shard_path(course.id))), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            face.status = 'active'
+            face.save()
+            enrolment.status = 'dropped'
+            enrolment.save()
+        self.assertEqual(len(open_shard(shard_path(course.id))), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enrolment.status = 'active'
+            enrolment.save()
+        self.assertEqual(open_shard(shard_path(course.id)).user_ids.tolist(), [student.id])
+
+    def test_export_command(self):
+        course = make_course('SH2')
+        call_command('export_face_galleries', stdout=io.StringIO())
+        self.assertTrue(shard_path(course.id).exists())
+
+
+@tag('benchmark')
+class FaceMatchingBenchmark(TestCase):
+    '''
+    Probes per second against roster size, one batched distance computation
+    per probe
+    '''
+    def test_probes_per_second(self):
+        dim = encoding_dim()
+        for roster_size in [50, 300, 1000, 5000]:
+            gallery, vectors = random_gallery(roster_size, dim=dim)
+            probes = vectors[np.arange(1000) % roster_size] + 0.01
+            started = time.perf_counter()
+            for probe in probes:
+                gallery.match(probe)
+            elapsed = time.perf_counter() - started
+            per_probe = elapsed / len(probes)
+            print(f'\n[face matching] roster {roster_size} x {dim}d: '
+                  f'{len(probes) / elapsed:,.0f} probes/s, {per_probe * 1e6:.1f} us/probe')
+            if roster_size == 300:
+                self.assertLess(per_probe, 0.001)
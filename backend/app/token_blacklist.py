@@ -0,0 +1,107 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BloomFilter:
+    '''
+    Fixed size Bloom filter over strings, sized for `capacity` items at the
+    `error_rate` false positive rate. Positions come from one blake2b digest
+    split into two halves (Kirsch-Mitzenmacher double hashing).
+    '''
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.num_bits = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(round(self.num_bits / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    '''
+    In memory answer to "is this refresh token JTI blacklisted?". A Bloom
+    filter of every blacklisted JTI rules out almost all valid tokens without
+    touching the database, positives are confirmed with one indexed query and
+    remembered in an exact set.
+
+    The filter is synced incrementally (rows with an id above the last one
+    seen) at most every TOKEN_BLACKLIST_SYNC_INTERVAL seconds and rebuilt from
+    scratch every TOKEN_BLACKLIST_REBUILD_INTERVAL seconds, which drops purged
+    JTIs and resizes it. Tokens blacklisted by this process are added
+    immediately, other processes see them after their next sync.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+            self._confirmed = set()
+            self._last_id = 0
+            self._synced_at = 0.0
+            self._built_at = 0.0
+
+    def _rebuild(self, now):
+        capacity = max(settings.TOKEN_BLACKLIST_BLOOM_CAPACITY, 2 * BlacklistedToken.objects.count())
+        self._bloom = BloomFilter(capacity, settings.TOKEN_BLACKLIST_ERROR_RATE)
+        self._confirmed = set()
+        self._last_id = 0
+        self._built_at = now
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._bloom is not None and now - self._synced_at < settings.TOKEN_BLACKLIST_SYNC_INTERVAL:
+                return
+            if self._bloom is None or now - self._built_at >= settings.TOKEN_BLACKLIST_REBUILD_INTERVAL:
+                self._rebuild(now)
+            rows = BlacklistedToken.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'token__jti')
+            for row_id, jti in rows.iterator(chunk_size=5000):
+                self._bloom.add(jti)
+                self._last_id = row_id
+            if self._bloom.count > self._bloom.capacity:
+                # Over capacity the false positive rate climbs, resize on the next sync
+                self._built_at = 0.0
+            self._synced_at = now
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._confirmed.add(jti)
+
+    def __contains__(self, jti):
+        self.sync()
+        with self._lock:
+            if jti in self._confirmed:
+                return True
+            if jti not in self._bloom:
+                return False
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if blacklisted:
+            with self._lock:
+                self._confirmed.add(jti)
+        return blacklisted
+
+
+blacklist_filter = BlacklistFilter()
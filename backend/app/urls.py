@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/auth/logout/', views.LogoutView.as_view(), name='logout'),
     path('api/auth/refresh/', views.TokenRefreshView.as_view(), name='refresh'),
     path('api/auth/users/<int:user_id>', views.UserDetailView.as_view(), name='user-detail'),
+    path('api/users/import/', views.UserImportView.as_view(), name='user-import'),
 
     # Clubs
     path('api/clubs/', views.ClubListCreateView.as_view(), name='club-list'),
@@ -49,6 +50,7 @@ urlpatterns = [
     # Resources
     # path('api/resources/', views.ResourceListCreateView.as_view(), name='resource-list'),
     # path('api/resources/<int:resource_id>/', views.ResourceDetailView.as_view(), name='resource-detail'),
+    path('api/resources/availability/', views.MultiResourceAvailabilityView.as_view(), name='resources-availability'),
     path('api/resources/<int:resource_id>/availability/', views.ResourceAvailabilityView.as_view(), name='resource-availability'),
     path('api/resources/<int:resource_id>/bookings/', views.BookingCreateView.as_view(), name='booking-create'),
 
@@ -70,6 +72,8 @@ urlpatterns = [
     # path('api/attendance-sessions/', views.AttendanceSessionCreateView.as_view(), name='attendance-session-create'),
     # path('api/attendance-sessions/active/', views.ActiveAttendanceSessionListView.as_view(), name='active-attendance-sessions'),
     # path('api/attendance-sessions/<int:session_id>/', views.AttendanceSessionDetailView.as_view(), name='attendance-session-detail'),
+    path('api/attendance-sessions/<int:session_id>/facial/', views.FacialRecognitionAttendanceView.as_view(), name='facial-attendance'),
+    path('api/attendance-sessions/<int:session_id>/facial/batch/', views.FacialAttendanceBatchView.as_view(), name='facial-attendance-batch'),
 
     # Facial Recognition
     # path('api/facial-recognition/enroll/', views.FacialEnrollmentView.as_view(), name='facial-enroll'),
@@ -79,7 +83,14 @@ urlpatterns = [
 
     # Attendance Reports
     # path('api/student/attendance/', views.StudentAttendanceView.as_view(), name='student-attendance'),
-    # path('api/courses/<int:course_id>/attendance/', views.CourseAttendanceView.as_view(), name='course-attendance'),
+    path('api/courses/<int:course_id>/attendance/', views.CourseAttendanceView.as_view(), name='course-attendance'),
+    path('api/courses/<int:course_id>/attendance-logs/', views.CourseAttendanceLogView.as_view(), name='course-attendance-logs'),
+
+    # Exports
+    path('api/exports/<str:dataset>/', views.ExportView.as_view(), name='export'),
+
+    # Metrics
+    path('api/metrics/', views.MetricsView.as_view(), name='metrics'),
 
     # SWAGGER DOCS
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -1,13 +1,17 @@
 from datetime import datetime, timedelta
 import base64
 import io
+import json
 import re
 import numpy as np
 from PIL import Image
 
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
 from django.contrib.auth import authenticate
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 
@@ -16,7 +20,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 
 # Import models and serializers
 from .models import (
@@ -31,6 +35,25 @@ from .serializers import (
     AttendanceSessionSerializer, ClubMembershipSerializer,
     ResourceSerializer, ClubSerializer, EventSerializer
 )
+from .attendance import mark_facial_attendance_batch
+from .attendance_report import AttendanceReportError, course_attendance_report, parse_report_params
+from .authentication import ClaimsRefreshToken
+from .availability import AvailabilityError, compute_availability, parse_availability_params
+from .bookings import BookingConflict, create_booking
+from .conditional import list_validators, object_validators
+from .db_routing import replica_reads
+from .events import EventWindowError, filter_event_window, reserve_event_seat
+from .exports import EXPORT_FORMATS, EXPORTS, ExportError, stream_export
+from .face_gallery import gallery_cache
+from .face_pipeline import face_pipeline, InvalidImage, PipelineBusy
+from .log_archive import course_logs
+from .memberships import BulkMembershipError, add_members, clean_roll_numbers, remove_members
+from .pagination import expanded_relations, paginate
+from .permissions import CanManageClub
+from .performance import get_performance_rollup
+from .provisioning import ImportFormatError, detect_format, import_in_background
+from .resolvers import resolve_club_id, resolve_membership_keys, resolve_user_id
+from .response_cache import cached_response, response_cache_stats
 ##############################################################################################################################
 # Authentication
 class RegisterView(APIView):
@@ -46,6 +69,34 @@ class RegisterView(APIView):
             return Response({'message': 'User has been registered'})
         return Response({'message': serialized_user.errors})
 
+class UserImportView(APIView):
+    '''
+    Bulk creates users from an uploaded CSV or NDJSON `file` (admins only).
+    The response is NDJSON: one progress line per chunk, then the summary.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.role != 'admin':
+            return Response({
+                'error': 'Only admins can import users'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A CSV or NDJSON file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            format = detect_format(upload.name, request.data.get('format'))
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The import runs in its own thread, a client going away only stops
+        # the progress lines
+        events = import_in_background(upload.file, format)
+        lines = (json.dumps(event) + '\n' for event in events)
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
 class UserDetailView(APIView):
     '''
     Returns the user details
@@ -55,8 +106,9 @@ class UserDetailView(APIView):
     def get(self, request, user_id):
         try:
             user = User.objects.get(id=user_id)
-            serializer = UserSerializer(user)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            validators = object_validators(request, user)
+            return validators.not_modified(request) or validators.apply(
+                Response(UserSerializer(user).data, status=status.HTTP_200_OK))
         except User.DoesNotExist:
             return Response(
                 {'error': 'User not found'}, 
@@ -76,7 +128,7 @@ class LoginView(APIView):
         user = authenticate(email=email, password=password)
         if user is not None:
             # Generate a fresh token
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             return Response({
                 'refresh_token': str(refresh),
                 'access_token': str(refresh.access_token),
@@ -102,7 +154,7 @@ class LogoutView(APIView):
         try:
             # Get the refresh token from the request data
             refresh_token = request.data.get('refresh_token')
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             # Blacklist the refresh token
             token.blacklist()
 
@@ -126,7 +178,7 @@ class TokenRefreshView(APIView):
 
         try:
             # Decode the refresh token
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
 
             # Create a new access token
             new_access_token = token.access_token
@@ -147,17 +199,20 @@ class ClubListCreateView(APIView):
     '''
     permission_classes = [IsAuthenticated]
 
+    @cached_response(Club)
+    @replica_reads
     def get(self, request):
         club_name = request.GET.get("club_name", None)
         if club_name:
-            if Club.objects.filter(name=club_name).exists():
-                club = Club.objects.get(name=club_name)
-                serializer = ClubSerializer(club)
-                return Response(serializer.data, status=status.HTTP_200_OK)
+            club = Club.objects.filter(name=club_name).first()
+            if club is not None:
+                validators = object_validators(request, club)
+                return validators.not_modified(request) or validators.apply(
+                    Response(ClubSerializer(club).data, status=status.HTTP_200_OK))
             return Response({"error": f"No club exists with the name: {club_name}"}, status=status.HTTP_404_NOT_FOUND)
         clubs = Club.objects.all()
-        serializer = ClubSerializer(clubs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        validators = list_validators(request, clubs)
+        return validators.not_modified(request) or validators.apply(paginate(request, clubs, ClubSerializer))
 
     def post(self, request):
         if request.user.role not in ['admin', 'faculty']:
@@ -167,7 +222,7 @@ class ClubListCreateView(APIView):
 
         serializer = ClubSerializer(data=request.data)
         if serializer.is_valid():
-            club = serializer.save(faculty_advisor=request.user)
+            club = serializer.save(faculty_advisor_id=request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -178,7 +233,7 @@ class ClubListCreateView(APIView):
                 'error': 'Only admins or faculty can create clubs'
             }, status=status.HTTP_403_FORBIDDEN)
 
-        club = Club.objects.get(faculty_advisor=request.user)
+        club = Club.objects.get(faculty_advisor_id=request.user.id)
 
         serializer = ClubSerializer(club, data=request.data, partial=True)
         if serializer.is_valid():
@@ -193,8 +248,8 @@ class ClubListCreateView(APIView):
             }, status=status.HTTP_403_FORBIDDEN)
 
         club_name = request.data['club_name']
-        if Club.objects.filter(name=club_name).exists():
-            club = Club.objects.get(name=request.data["club_name"])
+        club = Club.objects.filter(name=club_name).first()
+        if club is not None:
             club.delete()
             return Response({"message": "Club deleted successfully"}, status=status.HTTP_200_OK)
         return Response({"message": f"No club exist with the name: {club_name}"}, status=status.HTTP_400_BAD_REQUEST)
@@ -203,46 +258,64 @@ class ClubListCreateView(APIView):
 class ClubMembershipListCreateView(APIView):
     '''
     CRUD for Club members with restricted permissions for operations to coordinators and faculties'''
+    permission_classes = [CanManageClub]
+
+    def get_permission_club_id(self, request):
+        # Unknown clubs are answered with a 404 by the handler
+        try:
+            return resolve_club_id(request.data.get('club'))
+        except Club.DoesNotExist:
+            return None
+
+    @cached_response(ClubMembership, Club, User)
     def get(self, request):
         club_name = request.GET.get('club_name', None)
         member_roll_no = request.GET.get('member_roll_no', None)
         if club_name:
-            if Club.objects.filter(name=club_name).exists():
-                club = Club.objects.get(name=club_name)
-                club_member_details = ClubMembership.objects.filter(club=club)
-                serialized_data = ClubMembershipSerializer(
-                    club_member_details, many=True)
-                return Response(serialized_data.data)
-            return Response({"error": f"No club exists with the name: {club_name}"})
+            try:
+                club_id = resolve_club_id(club_name)
+            except Club.DoesNotExist:
+                return Response({"error": f"No club exists with the name: {club_name}"})
+            club_member_details = ClubMembership.objects.filter(club_id=club_id)
+            validators = list_validators(
+                request, club_member_details, expanded_relations(request, ClubMembershipSerializer))
+            return validators.not_modified(request) or validators.apply(
+                paginate(request, club_member_details, ClubMembershipSerializer))
         elif member_roll_no:
-            member = User.objects.get(roll_no=member_roll_no)
+            try:
+                member_id = resolve_user_id(member_roll_no)
+            except User.DoesNotExist:
+                return Response({"error": f"No user with the roll number: {member_roll_no}"},
+                                status=status.HTTP_404_NOT_FOUND)
             club_names = ClubMembership.objects.filter(
-                user=member, role='coordinator')
+                user_id=member_id, role='coordinator')
             club_names = club_names.values_list("club__name", flat=True)
-            return Response({"club_names": club_names}, status=status.HTTP_200_OK)
-        serialized_data = ClubMembershipSerializer(
-            ClubMembership.objects.all(), many=True)
-        return Response(serialized_data.data)
+            return Response({"club_names": list(club_names)}, status=status.HTTP_200_OK)
+        memberships = ClubMembership.objects.all()
+        validators = list_validators(request, memberships, expanded_relations(request, ClubMembershipSerializer))
+        return validators.not_modified(request) or validators.apply(
+            paginate(request, memberships, ClubMembershipSerializer))
 
     def post(self, request):
-        if request.user.role not in ['faculty', 'coordinator']:
-            return Response({
-                'error': 'Only coordinators or faculties can add club members'
-            }, status=status.HTTP_403_FORBIDDEN)
-
         # data = { club, user, role, join_date, status }
+        # or { club, user: [roll no, ...], role, status } to add many at once
 
         club = request.data.get('club')  # club name
         user = request.data.get('user')  # user id (roll no)
 
+        if isinstance(user, list):
+            return self._bulk(request, club, user, add=True)
+
         del request.data['club']
         del request.data['user']
 
-        club = Club.objects.get(name=club)
-        user = User.objects.get(roll_no=user)
+        try:
+            club_id, user_id = resolve_membership_keys(club, user)
+        except (Club.DoesNotExist, User.DoesNotExist) as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
 
-        request.data['club'] = club.pk
-        request.data['user'] = user.pk
+        request.data['club'] = club_id
+        request.data['user'] = user_id
 
         serializer = ClubMembershipSerializer(data=request.data)
         if serializer.is_valid():
@@ -251,11 +324,6 @@ class ClubMembershipListCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self, request):
-        if request.user.role not in ['faculty', 'coordinator']:
-            return Response({
-                'error': 'Only coordinators or faculties can add club members'
-            }, status=status.HTTP_403_FORBIDDEN)
-
         # data = { club, user, role, join_date, status }
 
         club = request.data.get('club')  # club name
@@ -264,10 +332,11 @@ class ClubMembershipListCreateView(APIView):
         del request.data['club']
         del request.data['user']
 
-        club = Club.objects.get(name=club)
-        user = User.objects.get(roll_no=user)
-
-        club_membership_obj = ClubMembership.objects.get(club=club, user=user)
+        try:
+            club_id, user_id = resolve_membership_keys(club, user)
+            club_membership_obj = ClubMembership.objects.get(club_id=club_id, user_id=user_id)
+        except (Club.DoesNotExist, User.DoesNotExist, ClubMembership.DoesNotExist) as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = ClubMembershipSerializer(
             club_membership_obj, data=request.data, partial=True)
@@ -277,51 +346,90 @@ class ClubMembershipListCreateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request):
-        if request.user.role not in ['faculty', 'coordinator']:
-            return Response({
-                'error': 'Only coordinators or faculties can add club members'
-            }, status=status.HTTP_403_FORBIDDEN)
-
-        # data = { club, user, role, join_date, status }
+        # data = { club, user } or { club, user: [roll no, ...] }
 
         club = request.data.get('club')  # club name
         user = request.data.get('user')  # user id (roll no)
 
+        if isinstance(user, list):
+            return self._bulk(request, club, user, add=False)
+
         del request.data['club']
         del request.data['user']
 
-        club = Club.objects.get(name=club)
-        user = User.objects.get(roll_no=user)
+        try:
+            club_id, user_id = resolve_membership_keys(club, user)
+        except (Club.DoesNotExist, User.DoesNotExist) as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
 
-        if ClubMembership.objects.filter(club=club, user=user).exists():
-            club_membership_obj = ClubMembership.objects.get(
-                club=club, user=user)
-            club_membership_obj.delete()
+        deleted, _ = ClubMembership.objects.filter(club_id=club_id, user_id=user_id).delete()
+        if deleted:
             return Response({"message": "User removed successfully"})
         return Response({"message": "User not present in Club"})
 
+    def _bulk(self, request, club, roll_nos, add):
+        '''
+        Adds or removes a list of roll numbers in one go, answering with the
+        outcome per roll number
+        '''
+        try:
+            roll_nos = clean_roll_numbers(roll_nos)
+            club_id = resolve_club_id(club)
+        except BulkMembershipError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Club.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        if not add:
+            return Response({'club': club, **remove_members(club_id, roll_nos)})
+
+        role = request.data.get('role', 'member')
+        member_status = request.data.get('status', 'active')
+        if role not in dict(ClubMembership.ROLE_CHOICES) or member_status not in dict(ClubMembership.STATUS_CHOICES):
+            return Response({'error': 'Invalid role or status'}, status=status.HTTP_400_BAD_REQUEST)
+        report = add_members(club_id, roll_nos, role=role, member_status=member_status)
+        return Response({'club': club, **report},
+                        status=status.HTTP_201_CREATED if report['counts'].get('added') else status.HTTP_200_OK)
+
 ##############################################################################################################################
 #Events
+def _event_club_id(request):
+    '''
+    The club an event is created in or moved to, None when the request
+    doesn't name one
+    '''
+    try:
+        return int(request.data.get('club'))
+    except (TypeError, ValueError):
+        return None
+
+
 class EventListCreateView(APIView):
     '''
     GET: List all events
-    POST: Create a new event (Only for coordinators and faculty)
+    POST: Create a new event (Only for coordinators of its club and faculty)
     '''
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CanManageClub]
+
+    def get_permission_club_id(self, request):
+        return _event_club_id(request)
 
+    # Club for ?expand=club
+    @cached_response(Event, Club)
+    @replica_reads
     def get(self, request):
-        events = Event.objects.all()
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data)
+        try:
+            events = filter_event_window(Event.objects.all(), request.query_params)
+        except EventWindowError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # 304 from one aggregate query, before any row is serialized
+        validators = list_validators(request, events, expanded_relations(request, EventSerializer))
+        return validators.not_modified(request) or validators.apply(paginate(request, events, EventSerializer))
 
     def post(self, request):
-        # Check if user has permissions to create event (coordinator or faculty)
-        if request.user.role not in ['faculty', 'coordinator']:
-            return Response({'error': 'You do not have permission to create events'}, status=status.HTTP_403_FORBIDDEN)
-        
         serializer = EventSerializer(data=request.data)
         if serializer.is_valid():
-            event = serializer.save(created_by=request.user)
+            event = serializer.save(created_by_id=request.user.id)
             return Response({
                 'message': 'Event created successfully',
                 'event': EventSerializer(event).data
@@ -334,24 +442,25 @@ class EventDetailUpdateDeleteView(APIView):
     GET: Retrieve an event
     PUT: Update an event
     DELETE: Delete an event
+    Writes are for faculty and the coordinators of the event's club
     '''
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CanManageClub]
+
+    def get_permission_club_id(self, request):
+        return _event_club_id(request)
 
     def get(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id)
-            serializer = EventSerializer(event)
-            return Response(serializer.data)
+            validators = object_validators(request, event)
+            return validators.not_modified(request) or validators.apply(Response(EventSerializer(event).data))
         except Event.DoesNotExist:
             return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
 
     def put(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id)
-            
-            # Check if user has permissions to update event (coordinator or faculty)
-            if request.user.role not in ['faculty', 'coordinator']:
-                return Response({'error': 'You do not have permission to update this event'}, status=status.HTTP_403_FORBIDDEN)
+            self.check_object_permissions(request, event)
 
             serializer = EventSerializer(event, data=request.data)
             if serializer.is_valid():
@@ -367,10 +476,7 @@ class EventDetailUpdateDeleteView(APIView):
     def delete(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id)
-            
-            # Check if user has permissions to delete event (coordinator or faculty)
-            if request.user.role not in ['faculty', 'coordinator']:
-                return Response({'error': 'You do not have permission to delete this event'}, status=status.HTTP_403_FORBIDDEN)
+            self.check_object_permissions(request, event)
 
             event.delete()
             return Response({'message': 'Event deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
@@ -393,32 +499,30 @@ class EventRegistrationView(APIView):
                     'error': 'Registration deadline has passed'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if event is at capacity
-            if event.max_participants:
-                current_registrations = EventRegistration.objects.filter(
-                    event=event).count()
-                if current_registrations >= event.max_participants:
-                    return Response({
-                        'error': 'Event has reached maximum capacity'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
             # Check if user is already registered
-            existing_registration = EventRegistration.objects.filter(
-                event=event,
-                user=request.user
-            ).first()
-
-            if existing_registration:
+            if EventRegistration.objects.filter(event=event, user_id=request.user.id).exists():
                 return Response({
                     'error': 'You are already registered for this event'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create registration
-            registration = EventRegistration.objects.create(
-                event=event,
-                user=request.user,
-                attendance_status='registered'
-            )
+            # Capacity check and increment are a single conditional UPDATE,
+            # the registration is rolled back with it if the insert fails
+            try:
+                with transaction.atomic():
+                    if not reserve_event_seat(event.id):
+                        return Response({
+                            'error': 'Event has reached maximum capacity'
+                        }, status=status.HTTP_400_BAD_REQUEST)
+
+                    registration = EventRegistration.objects.create(
+                        event=event,
+                        user_id=request.user.id,
+                        attendance_status='registered'
+                    )
+            except IntegrityError:
+                return Response({
+                    'error': 'You are already registered for this event'
+                }, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({
                 'message': 'Successfully registered for the event',
@@ -435,60 +539,38 @@ class EventRegistrationView(APIView):
 
 
 class ResourceAvailabilityView(APIView):
+    '''
+    Slot availability of one resource for a day (`date`) or a range of days
+    (`start_date`, `end_date`), with `slot_minutes` sized slots
+    '''
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request, resource_id):
         try:
             resource = Resource.objects.get(id=resource_id)
-            date_str = request.query_params.get('date')
-
-            if not date_str:
-                return Response({
-                    'error': 'Date parameter is required'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
             try:
-                date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
+                start_date, end_date, slot_minutes = parse_availability_params(request.query_params)
+            except AvailabilityError as e:
                 return Response({
-                    'error': 'Invalid date format. Use YYYY-MM-DD'
+                    'error': str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Get approved bookings for the date
-            bookings = ResourceBooking.objects.filter(
-                resource=resource,
-                start_time__date=date,
-                status='approved'
-            )
+            days = compute_availability([resource], start_date, end_date, slot_minutes)[resource.id]
 
-            # Create time slots (hourly from 9 AM to 6 PM)
-            all_slots = []
-            start_hour = 9
-            end_hour = 18
-
-            for hour in range(start_hour, end_hour):
-                slot_start = datetime.combine(
-                    date, datetime.min.time().replace(hour=hour))
-                slot_end = slot_start + timedelta(hours=1)
-
-                is_available = True
-                for booking in bookings:
-                    if (slot_start >= booking.start_time and slot_start < booking.end_time) or \
-                       (slot_end > booking.start_time and slot_end <= booking.end_time) or \
-                       (slot_start <= booking.start_time and slot_end >= booking.end_time):
-                        is_available = False
-                        break
-
-                all_slots.append({
-                    'start_time': slot_start.strftime('%H:%M'),
-                    'end_time': slot_end.strftime('%H:%M'),
-                    'is_available': is_available and resource.status == 'available'
+            if 'date' in request.query_params and start_date == end_date:
+                return Response({
+                    'resource': ResourceSerializer(resource).data,
+                    'date': days[0]['date'],
+                    'slot_minutes': slot_minutes,
+                    'time_slots': days[0]['time_slots']
                 })
-
             return Response({
                 'resource': ResourceSerializer(resource).data,
-                'date': date_str,
-                'time_slots': all_slots
+                'start_date': start_date,
+                'end_date': end_date,
+                'slot_minutes': slot_minutes,
+                'days': days
             })
 
         except Resource.DoesNotExist:
@@ -497,62 +579,101 @@ class ResourceAvailabilityView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
-class BookingCreateView(APIView):
+class MultiResourceAvailabilityView(APIView):
+    '''
+    Slot availability of many resources (`resource_ids=1,2,3`) over a range of
+    days in one request
+    '''
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, resource_id):
+    @replica_reads
+    def get(self, request):
         try:
-            resource = Resource.objects.get(id=resource_id)
+            resource_ids = [
+                int(resource_id) for resource_id in request.query_params.get('resource_ids', '').split(',')
+                if resource_id.strip()
+            ]
+        except ValueError:
+            return Response({
+                'error': 'resource_ids must be a comma separated list of ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not resource_ids:
+            return Response({
+                'error': 'resource_ids parameter is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(resource_ids) > settings.RESOURCE_AVAILABILITY_MAX_RESOURCES:
+            return Response({
+                'error': f'At most {settings.RESOURCE_AVAILABILITY_MAX_RESOURCES} resources per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Parse start and end times
-            try:
-                start_time = datetime.strptime(
-                    request.data.get('start_time'), '%Y-%m-%d %H:%M')
-                end_time = datetime.strptime(
-                    request.data.get('end_time'), '%Y-%m-%d %H:%M')
-            except ValueError:
-                return Response({
-                    'error': 'Invalid time format. Use YYYY-MM-DD HH:MM'
-                }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start_date, end_date, slot_minutes = parse_availability_params(request.query_params)
+        except AvailabilityError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-            if start_time >= end_time:
-                return Response({
-                    'error': 'End time must be after start time'
-                }, status=status.HTTP_400_BAD_REQUEST)
+        resources = list(Resource.objects.filter(id__in=resource_ids).order_by('id'))
+        availability = compute_availability(resources, start_date, end_date, slot_minutes)
 
-            # Check for conflicting bookings
-            conflicting_bookings = ResourceBooking.objects.filter(
-                resource=resource,
-                status='approved',
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            )
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'slot_minutes': slot_minutes,
+            'resources': [
+                {
+                    'resource': ResourceSerializer(resource).data,
+                    'days': availability[resource.id]
+                }
+                for resource in resources
+            ],
+            'not_found': sorted(set(resource_ids) - {resource.id for resource in resources})
+        })
 
-            if conflicting_bookings.exists():
-                return Response({
-                    'error': 'Resource is already booked for this time period'
-                }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create booking
-            booking = ResourceBooking.objects.create(
-                resource=resource,
-                user=request.user,
-                start_time=start_time,
-                end_time=end_time,
-                purpose=request.data.get('purpose'),
-                num_attendees=request.data.get('num_attendees', 1),
-                status='pending'
-            )
+class BookingCreateView(APIView):
+    permission_classes = [IsAuthenticated]
 
+    def post(self, request, resource_id):
+        # Parse start and end times
+        try:
+            start_time = timezone.make_aware(datetime.strptime(
+                request.data.get('start_time'), '%Y-%m-%d %H:%M'))
+            end_time = timezone.make_aware(datetime.strptime(
+                request.data.get('end_time'), '%Y-%m-%d %H:%M'))
+        except (TypeError, ValueError):
             return Response({
-                'message': 'Booking request submitted successfully',
-                'booking_id': booking.id
-            }, status=status.HTTP_201_CREATED)
+                'error': 'Invalid time format. Use YYYY-MM-DD HH:MM'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
+        if start_time >= end_time:
+            return Response({
+                'error': 'End time must be after start time'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Conflict check and insert happen under a lock on the resource
+        try:
+            booking = create_booking(
+                resource_id,
+                request.user.id,
+                start_time,
+                end_time,
+                purpose=request.data.get('purpose'),
+                num_attendees=request.data.get('num_attendees', 1)
+            )
         except Resource.DoesNotExist:
             return Response({
                 'error': 'Resource not found'
             }, status=status.HTTP_404_NOT_FOUND)
+        except BookingConflict as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': 'Booking request submitted successfully',
+            'booking_id': booking.id
+        }, status=status.HTTP_201_CREATED)
 
 
 # views.py
@@ -561,6 +682,7 @@ class BookingCreateView(APIView):
 class StudentPerformanceView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
         user = request.user
 
@@ -569,79 +691,8 @@ class StudentPerformanceView(APIView):
                 'error': 'Only students can access this endpoint'
             }, status=status.HTTP_403_FORBIDDEN)
 
-        # Get all courses the student is enrolled in
-        student_courses = StudentCourse.objects.filter(
-            student=user, status='active')
-
-        # Calculate GPA and compile course data
-        total_credits = 0
-        weighted_gpa = 0
-
-        grade_points = {
-            'A+': 10, 'A': 9, 'A-': 8.5,
-            'B+': 8, 'B': 7, 'B-': 6.5,
-            'C+': 6, 'C': 5, 'C-': 4.5,
-            'D': 4, 'F': 0
-        }
-
-        courses_data = []
-        for sc in student_courses:
-            course = sc.course
-
-            # Get grade for this course
-            grade_report = GradeReport.objects.filter(
-                student=user,
-                course=course
-            ).first()
-
-            # Get assessments for this course
-            assessments = StudentAssessment.objects.filter(
-                student=user,
-                assessment__course=course
-            )
-
-            assessment_data = []
-            for assessment in assessments:
-                assessment_data.append({
-                    'title': assessment.assessment.title,
-                    'marks_obtained': assessment.marks_obtained,
-                    'max_marks': assessment.assessment.max_marks,
-                    'percentage': (assessment.marks_obtained / assessment.assessment.max_marks) * 100
-                })
-
-            # Get attendance for this course
-            attendance_records = Attendance.objects.filter(
-                student=user,
-                course=course
-            )
-
-            total_classes = attendance_records.count()
-            present_count = attendance_records.filter(status='present').count()
-            attendance_percentage = (
-                present_count / total_classes * 100) if total_classes > 0 else 0
-
-            # Calculate GPA contribution
-            if grade_report:
-                grade = grade_report.grade
-                grade_point = grade_points.get(grade, 0)
-                weighted_gpa += grade_point * course.credits
-                total_credits += course.credits
-            else:
-                grade = 'N/A'
-                grade_point = 0
-
-            courses_data.append({
-                'course_code': course.code,
-                'course_name': course.name,
-                'credits': course.credits,
-                'grade': grade,
-                'grade_point': grade_point,
-                'attendance_percentage': attendance_percentage,
-                'assessments': assessment_data
-            })
-
-        # Calculate CGPA
-        cgpa = (weighted_gpa / total_credits) if total_credits > 0 else 0
+        # Precomputed report, kept up to date by app/signals.py
+        rollup = get_performance_rollup(user.id)
 
         return Response({
             'student': {
@@ -649,9 +700,9 @@ class StudentPerformanceView(APIView):
                 'name': f"{user.first_name} {user.last_name}",
                 'email': user.email
             },
-            'cgpa': round(cgpa, 2),
-            'total_credits': total_credits,
-            'courses': courses_data
+            'cgpa': rollup.cgpa,
+            'total_credits': rollup.total_credits,
+            'courses': rollup.courses
         })
 
 
@@ -671,8 +722,8 @@ class FacialRecognitionAttendanceView(APIView):
 
         try:
             # Get session
-            session = AttendanceSession.objects.get(
-                id=session_id, status='active')
+            session = AttendanceSession.objects.select_related('course').get(
+                id=session_id, status='ongoing')
 
             if session.verification_method != 'facial_recognition':
                 return Response({
@@ -681,7 +732,7 @@ class FacialRecognitionAttendanceView(APIView):
 
             # Check if student is enrolled in the course
             student_course = StudentCourse.objects.filter(
-                student=user,
+                student_id=user.id,
                 course=session.course,
                 status='active'
             ).first()
@@ -692,10 +743,11 @@ class FacialRecognitionAttendanceView(APIView):
                 }, status=status.HTTP_403_FORBIDDEN)
 
             # Check if attendance already marked
+            today = timezone.localdate()
             existing_attendance = Attendance.objects.filter(
-                student=user,
+                student_id=user.id,
                 course=session.course,
-                date=datetime.now().date()
+                date=today
             ).first()
 
             if existing_attendance:
@@ -703,13 +755,10 @@ class FacialRecognitionAttendanceView(APIView):
                     'error': 'Attendance already marked for today'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Get user's stored face encoding
-            facial_data = FacialRecognitionData.objects.filter(
-                user=user,
-                status='active'
-            ).first()
+            # Encodings of the whole roster, mapped from the course shard
+            gallery = gallery_cache.get(session)
 
-            if not facial_data:
+            if user.id not in gallery:
                 return Response({
                     'error': 'Face data not enrolled. Please register your face first.'
                 }, status=status.HTTP_400_BAD_REQUEST)
@@ -721,27 +770,40 @@ class FacialRecognitionAttendanceView(APIView):
                     'error': 'Face image is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # In a real implementation, we'd compare face encodings here
-            # For MVP, we'll simulate success
-            is_match = True
+            # Decoding and normalization run in the face pipeline's process pool
+            try:
+                probe, _ = face_pipeline.process(face_image.read())
+            except InvalidImage as e:
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except PipelineBusy:
+                return Response({
+                    'error': 'Face verification is busy. Please try again.'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            # Closest face in the roster has to be the student themselves
+            matched_user_id, distance = gallery.match(probe)
+            is_match = matched_user_id == user.id
 
             if is_match:
                 # Mark attendance
-                attendance = Attendance.objects.create(
-                    student=user,
+                Attendance.objects.create(
+                    student_id=user.id,
                     course=session.course,
-                    date=datetime.now().date(),
+                    date=today,
                     status='present',
                     verification_method='facial_recognition',
-                    verification_data={'matched': True}
+                    verification_data={'matched': True, 'distance': distance}
                 )
 
                 # Log success
                 AttendanceLog.objects.create(
-                    attendance=attendance,
-                    log_type='facial_recognition_success',
-                    log_details={'session_id': session.id},
-                    timestamp=datetime.now()
+                    student_id=user.id,
+                    course=session.course,
+                    session=session,
+                    status='present',
+                    method='facial_recognition'
                 )
 
                 return Response({
@@ -751,10 +813,12 @@ class FacialRecognitionAttendanceView(APIView):
             else:
                 # Log failure
                 AttendanceLog.objects.create(
-                    attendance=None,
-                    log_type='facial_recognition_failure',
-                    log_details={'user_id': user.id, 'session_id': session.id},
-                    timestamp=datetime.now()
+                    student_id=user.id,
+                    course=session.course,
+                    session=session,
+                    status='absent',
+                    method='facial_recognition',
+                    notes=f'Face verification failed (distance {distance:.3f})'
                 )
 
                 return Response({
@@ -765,3 +829,156 @@ class FacialRecognitionAttendanceView(APIView):
             return Response({
                 'error': 'Attendance session not found or not active'
             }, status=status.HTTP_404_NOT_FOUND)
+
+
+class FacialAttendanceBatchView(APIView):
+    '''
+    Records a whole batch of facial attendance marks from a classroom kiosk
+    in one request, returns the outcome of every mark
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id):
+        if request.user.role not in ['faculty', 'admin']:
+            return Response({
+                'error': 'Only faculty or admins can submit attendance batches'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        marks = request.data.get('marks')
+        if not isinstance(marks, list) or not marks:
+            return Response({
+                'error': 'marks must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(marks) > settings.ATTENDANCE_BATCH_MAX_SIZE:
+            return Response({
+                'error': f'At most {settings.ATTENDANCE_BATCH_MAX_SIZE} marks per batch'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = AttendanceSession.objects.get(id=session_id, status='ongoing')
+        except AttendanceSession.DoesNotExist:
+            return Response({
+                'error': 'Attendance session not found or not active'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        if session.verification_method != 'facial_recognition':
+            return Response({
+                'error': 'This session does not use facial recognition'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = mark_facial_attendance_batch(session, marks)
+        return Response({
+            'marked': sum(1 for result in results if result['status'] == 'present'),
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+
+class CourseAttendanceView(APIView):
+    '''
+    Attendance report of a course: per student status counts and percentage.
+    Optional `from` / `to` dates (inclusive) and `below` (e.g. 75) to list
+    only the students under that percentage.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        if request.user.role not in ['faculty', 'admin']:
+            return Response({
+                'error': 'Only faculty or admins can view course attendance'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            start, end, below = parse_report_params(request.query_params)
+        except AttendanceReportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        course = Course.objects.filter(id=course_id).values('id', 'code', 'name').first()
+        if course is None:
+            return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'course': course,
+            'from': start,
+            'to': end,
+            'below': below,
+            'students': course_attendance_report(course_id, start, end, below)
+        }, status=status.HTTP_200_OK)
+
+
+class CourseAttendanceLogView(APIView):
+    '''
+    Attendance logs of a course as NDJSON, archived ones included. Optional
+    `from` / `to` dates (inclusive) limit the archive partitions read.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        if request.user.role not in ['faculty', 'admin']:
+            return Response({
+                'error': 'Only faculty or admins can view attendance logs'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            start, end, _ = parse_report_params(request.query_params)
+        except AttendanceReportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not Course.objects.filter(id=course_id).exists():
+            return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        encoder = DjangoJSONEncoder()
+        lines = (encoder.encode(log) + '\n' for log in course_logs(course_id, start, end))
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
+class ExportView(APIView):
+    '''
+    Streams a full dump of attendance, grades or event registrations as CSV
+    (default) or NDJSON (`output=ndjson`), gzip compressed with `gzip=1`.
+    Filters: attendance by course, year, from, to; grades by course,
+    semester, year; registrations by event, club. Faculty and admins only.
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset):
+        if request.user.role not in ['faculty', 'admin']:
+            return Response({
+                'error': 'Only faculty or admins can export records'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        export = EXPORTS.get(dataset)
+        if export is None:
+            return Response({'error': f'Unknown export {dataset!r}'}, status=status.HTTP_404_NOT_FOUND)
+        # `format` is taken by DRF's renderer negotiation
+        format = request.query_params.get('output', 'csv')
+        if format not in EXPORT_FORMATS:
+            return Response({'error': 'output must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset = export.queryset(request.query_params)
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        filename = f'{dataset}.{format}' + ('.gz' if compress else '')
+        response = StreamingHttpResponse(
+            stream_export(export, queryset, format, compress),
+            content_type='application/gzip' if compress else EXPORT_FORMATS[format])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class MetricsView(APIView):
+    '''
+    Runtime metrics of this worker process (admins only)
+    '''
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'admin':
+            return Response({
+                'error': 'Only admins can view metrics'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        return Response({
+            'face_pipeline': face_pipeline.stats(),
+            'response_cache': response_cache_stats.snapshot(),
+        })
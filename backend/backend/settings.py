@@ -32,6 +32,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.db_routing.ReplicaStickinessMiddleware',
+    'app.resolvers.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,12 +57,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer, NORMAL sync is durable in WAL mode except on power loss
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms a connection waits for a lock before 'database is locked'
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative is KiB, so 64 MiB per connection
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+SQLITE_TUNED = os.environ.get('SQLITE_TUNED', '1') != '0'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (instead of the shared in-memory database) so the concurrency
+        # tests see real SQLite locking between connections
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
+if SQLITE_TUNED:
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        # Take the write lock when a transaction starts rather than on its
+        # first write, so a read-then-write transaction waits its turn instead
+        # of failing on the lock upgrade
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+    }
+
+# Read replicas, e.g. DATABASE_REPLICA_PATHS=replica.sqlite3 to try it locally
+# with a copy of db.sqlite3. Tests read the replicas through the default database.
+DATABASE_REPLICAS = []
+for i, path in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_PATHS', '').split(',')), start=1):
+    alias = f'replica{i}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['app.db_routing.PrimaryReplicaRouter']
+DATABASE_REPLICA_STICKY_SECONDS = 10  # a client that wrote reads from the primary for this long
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -95,10 +138,64 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'app.authentication.ClaimsJWTAuthentication',
     ),
 }
 
+# Local memory by default. Set DJANGO_CACHE_DIR to share the cache (claim
+# staleness markers, response cache versions) between processes on one host
+# or point it at Redis / Memcached. A process local cache is refused at
+# startup (app/caching.py) unless the app runs in a single process, as
+# runserver and the test runner do
+SINGLE_PROCESS = os.environ.get('DJANGO_SINGLE_PROCESS', '1' if DEBUG else '0') == '1'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    } if not os.environ.get('DJANGO_CACHE_DIR') else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+    },
+}
+
+# Response cache of list endpoints (app/response_cache.py), turned off on a
+# process local cache unless SINGLE_PROCESS
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300  # seconds, bounds staleness when a write bypasses the signals
+
+# Claims based authentication (app/authentication.py). Staleness markers of
+# changed users live in the default cache, which has to be shared when
+# running several processes (SINGLE_PROCESS)
+AUTH_USER_CACHE_SIZE = 1024  # full User rows kept per process
+
+# Clubs a user coordinates (app/permissions.py), evicted on membership changes
+# from the default cache, which has to be shared (SINGLE_PROCESS)
+PERMISSION_CACHE_TIMEOUT = 600
+
+# Refresh token blacklist filter (app/token_blacklist.py)
+TOKEN_BLACKLIST_SYNC_INTERVAL = 30  # seconds between incremental syncs from the database
+TOKEN_BLACKLIST_REBUILD_INTERVAL = 3600  # seconds between full rebuilds, drops purged tokens
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100_000  # minimum number of JTIs the filter is sized for
+TOKEN_BLACKLIST_ERROR_RATE = 0.001  # Bloom filter false positive rate
+
+# Bulk user import (app/provisioning.py)
+USER_IMPORT_WORKERS = int(os.environ.get('USER_IMPORT_WORKERS', os.cpu_count() or 1))  # password hashing processes, 0 hashes inline
+USER_IMPORT_CHUNK_SIZE = 500  # rows validated, hashed and inserted together
+
+# Streaming CSV / NDJSON exports (app/exports.py)
+EXPORT_CHUNK_SIZE = 2000  # rows fetched from the cursor and encoded together
+
+# Club name / roll number -> pk resolution (app/resolvers.py)
+RESOLVER_CACHE_TTL = 30  # seconds a resolved natural key is reused by this process
+RESOLVER_CACHE_SIZE = 10000
+
+# Bulk club membership changes (app/memberships.py)
+CLUB_MEMBERSHIP_BULK_MAX_SIZE = 1000  # roll numbers per request
+
+# Keyset pagination of list endpoints (app/pagination.py)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
 AUTH_USER_MODEL = 'app.User'
 
 AUTHENTICATION_BACKENDS = [
@@ -117,4 +214,27 @@ SIMPLE_JWT = {
 
 CORS_ALLOW_CREDENTIALS = True
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Resource availability
+RESOURCE_AVAILABILITY_HOURS = (9, 18)  # bookable window of a day, local time
+RESOURCE_AVAILABILITY_MAX_DAYS = 31  # longest date range per availability request
+RESOURCE_AVAILABILITY_MAX_RESOURCES = 50  # resources per availability request
+
+# Facial recognition
+FACE_ENCODING_SIZE = (16, 16)  # thumbnail size, encodings have width * height dims
+FACE_MATCH_THRESHOLD = 0.6  # max euclidean distance between unit encodings
+FACE_GALLERY_DIR = os.path.join(MEDIA_ROOT, 'face_gallery')  # per course roster shards
+FACE_GALLERY_DTYPE = 'float32'  # or 'float16' for half size shards, widened on open
+FACE_GALLERY_CACHE_SIZE = 64  # sessions kept in the per process gallery cache
+ATTENDANCE_BATCH_MAX_SIZE = 200  # marks accepted per kiosk batch
+FACE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024  # larger face uploads are rejected
+FACE_IMAGE_MAX_PIXELS = 50_000_000  # decompression bomb guard
+FACE_PIPELINE_DECODE_SIZE = 256  # JPEGs are draft-decoded down to roughly this size
+FACE_PIPELINE_WORKERS = int(os.environ.get('FACE_PIPELINE_WORKERS', 2))  # 0 processes inline
+FACE_PIPELINE_QUEUE_SIZE = 32  # images queued or in flight per web worker
+FACE_PIPELINE_QUEUE_TIMEOUT = 2  # seconds to wait for a queue slot before answering 503
+
+# Attendance log archival (app/log_archive.py)
+ATTENDANCE_LOG_RETENTION_DAYS = 180  # logs older than this are archived by archive_attendance_logs
+ATTENDANCE_LOG_ARCHIVE_DIR = os.path.join(MEDIA_ROOT, 'attendance_logs')  # gzipped NDJSON, one directory per day